@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""Columnar storage of configuration trees.
+Each device description is pickled in its own row of a VLArray, with a separate
+row listing device paths, so one device can be read without decoding the others.
+Versions only store devices differing from the original tree."""
+try:
+    from cPickle import dumps, loads
+except:
+    from pickle import dumps, loads
+import numpy as np
+import tables
+
+from ..csutil import enc_options
+
+group_name = 'conf_devices'
+"""Name of the group holding a columnar tree, under root or a version group"""
+
+
+class Removed(object):
+
+    """Marker of a device removed from the original tree"""
+
+removed = Removed()
+
+
+def flatten(tree, path='/', out=None):
+    """Map each node path of `tree` to its 'self' description (None if missing)"""
+    if out is None:
+        out = {}
+    out[path] = tree.get('self', None)
+    for key, sub in tree.items():
+        if key == 'self' or not isinstance(sub, dict):
+            continue
+        flatten(sub, path + key + '/', out)
+    return out
+
+
+def unflatten(devices):
+    """Rebuild a configuration tree from a flattened {path: description} mapping"""
+    tree = {}
+    for path in sorted(devices.keys(), key=len):
+        node = tree
+        for key in path.split('/'):
+            if key:
+                node = node.setdefault(key, {})
+        desc = devices[path]
+        if desc is not None:
+            node['self'] = desc
+    return tree
+
+
+def equal(a, b):
+    try:
+        return bool(a == b)
+    except:
+        return False
+
+
+def delta(original, devices):
+    """Devices added or changed in `devices` with respect to `original`,
+    and removed ones mapped to `removed`"""
+    out = {}
+    for path, desc in devices.items():
+        if path not in original or not equal(original[path], desc):
+            out[path] = desc
+    for path in original:
+        if path not in devices:
+            out[path] = removed
+    return out
+
+
+def apply_delta(original, changes):
+    """Apply `changes` returned by delta() to a copy of `original` devices"""
+    out = original.copy()
+    for path, desc in changes.items():
+        if desc is removed:
+            out.pop(path, None)
+        else:
+            out[path] = desc
+    return out
+
+
+def encode(obj):
+    if obj is removed:
+        return np.array([], dtype=np.uint8)
+    return np.frombuffer(dumps(obj, 2), dtype=np.uint8)
+
+
+def decode(row):
+    if not len(row):
+        return removed
+    opt = enc_options.copy()
+    if 'encoding' in opt:
+        opt['encoding'] = 'latin1'
+    return loads(row.tobytes(), **opt)
+
+
+def write(test, where, devices, filters=None):
+    """Write `devices` as a columnar tree in group `where`/conf_devices of `test` file.
+    Devices mapped to `removed` are stored as empty rows. Returns the group."""
+    where = where.rstrip('/')
+    path = where + '/' + group_name
+    if path in test:
+        test.remove_node(path, recursive=True)
+    group = test.create_group(where or '/', group_name)
+    data = test.create_vlarray(group, 'data', atom=tables.UInt8Atom(), filters=filters)
+    paths = sorted(devices.keys())
+    for p in paths:
+        data.append(encode(devices[p]))
+    index = test.create_vlarray(group, 'paths', atom=tables.UInt8Atom(), filters=filters)
+    index.append(np.array(bytearray('\n'.join(paths).encode('utf8')), dtype=np.uint8))
+    return group
+
+
+def read_index(group):
+    """Map device paths to their row in `group`"""
+    paths = group.paths[0].tobytes().decode('utf8')
+    if not paths:
+        return {}
+    return dict((p, i) for i, p in enumerate(paths.split('\n')))
+
+
+def read_device(group, path, index=None):
+    """Read description of device `path` from `group`.
+    Returns False if not listed, `removed` if marked as removed."""
+    if index is None:
+        index = read_index(group)
+    if path not in index:
+        return False
+    return decode(group.data[index[path]])
+
+
+def read(group):
+    """Read all device descriptions in `group`"""
+    data = group.data
+    return dict((path, decode(data[i])) for path, i in read_index(group).items())
@@ -10,17 +10,29 @@ try:
     from cPickle import dumps
 except:
     from pickle import dumps
+    basestring = str
 from traceback import format_exc
 import functools
 from tables.nodes import filenode
+from tables.link import SoftLink
+from tables.leaf import Leaf
 from tables.file import _open_files
 from traceback import print_exc
 from time import time
 from multiprocessing import Lock
+import numpy as np
 
 from .. import csutil
 from ..csutil import lockme,  unlockme, enc_options
 from ..logger import get_module_logging
+from .timeindex import TimeIndex, tindex_path
+from .lod import lod_paths
+from .writebehind import WriteBuffer
+from .framecache import frame_cache
+from .nodecache import NodeCache
+
+shared_attr = '_shared'
+"""Attribute marking leaves hard-linked into another version, to be copied on write"""
 
 
 def addHeader(func):
@@ -32,10 +44,12 @@ def addHeader(func):
         if rc is not False:
             del kw['reference_class']
         g = func(self, *a, **kw)
+        self._invalidate_versioned(g._v_pathname)
         if rc:
             if rc not in self._header:
                 self._header[rc] = []
             self._header[rc].append(g._v_pathname)
+            self._append_userdata_header(rc, [g._v_pathname])
 #		self.test.flush()
         return True
     return addHeader_wrapper
@@ -44,12 +58,21 @@ def addHeader(func):
 class CoreFile(object):
 
     """Low-level HDF access functions"""
+    frame_cache = frame_cache
+    """Cache of decoded frames, shared by all files"""
 
     def __init__(self, path=False, uid='', mode='a', title='', 
                  log=get_module_logging(__name__), 
                  header=True, version= '', load_conf=False):
         self._header = {}  # static header listing
-        self.node_cache = {}
+        self.node_cache = NodeCache()
+        self._version_paths = {}
+        """Version: {original path: resolved path}"""
+        self._owned = set()
+        """Paths checked by _own_node"""
+        self.time_index = TimeIndex()
+        self.write_buffer = False
+        """Write-behind buffer, if enabled"""
         self.path = False
         self.uid = False
         self._test = False  # currently opened HDF file
@@ -96,19 +119,52 @@ class CoreFile(object):
             if not path.endswith('/'):
                 path += '/'
             path = path + subpath
-        n = self.node_cache.get(path, False)
-        if n is not False:
-            if not n._v_isopen:
-                self.log.debug('Found closed node. Reopening:', path, n._v_isopen)
-                n = False
-        if n is False:
+        n = self.node_cache.get(path)
+        if n is None:
             n = self.test.get_node(path)
-            # Never cache hard links
-            kid = getattr(n.attrs, 'kid', False)
-            if not kid or kid==path:
-                self.node_cache[path] = n
+            # Cache the resolved target of soft links
+            if isinstance(n, SoftLink):
+                n = n()
+            self.node_cache.put(path, n)
         return n
     
+    def _own_node(self, where, name=None):
+        """Node at `where` (optional child `name`) ready to be modified in place.
+        Version leaves marked as shared by link_version are first replaced
+        by a private copy, so the change does not affect the other versions.
+        Checked paths are remembered until they are removed or relinked.
+        Returns None if the node does not exist."""
+        if not isinstance(where, basestring):
+            return where
+        path = where if not name else where.rstrip('/') + '/' + name
+        if path in self._owned:
+            return self._get_node(path)
+        if not self._has_node(path):
+            return None
+        node = self._get_node(path)
+        target = node._v_pathname
+        if target.startswith('/ver_') and isinstance(node, Leaf) and \
+                shared_attr in node._v_attrs._v_attrnamesuser:
+            parent, leaf = node._v_parent, node._v_name
+            private = node.copy(parent, leaf + '_cow')
+            node._f_remove()
+            private._f_move(newname=leaf)
+            delattr(private._v_attrs, shared_attr)
+            for p in set([path, target]):
+                self.node_cache.invalidate(p)
+                self.time_index.invalidate(p)
+                self.frame_cache.invalidate(self.path, p)
+            self.log.debug('Copied shared node on write', target)
+            node = private
+        self._owned.add(path)
+        return node
+
+    def _written(self, where, node):
+        """Forget cached time columns of `node`, written in place, also if reached via `where`"""
+        self.time_index.invalidate(node._v_pathname)
+        if isinstance(where, basestring):
+            self.time_index.invalidate(where)
+
     @lockme()
     def get_node(self, path, subpath=False):
         return self._get_node(path, subpath=subpath)
@@ -155,10 +211,18 @@ class CoreFile(object):
                 return 'a'
         return 'r'
     
-    @lockme()
     def close(self, all_handlers=False):
+        # Pending writes need the lock: write them before acquiring it
+        self.stop_write_behind()
+        return self._close(all_handlers)
+
+    @lockme()
+    def _close(self, all_handlers=False):
         self.log.debug('CoreFile.close', self.path, type(self.test))
-        self.node_cache = {}
+        self.node_cache.clear()
+        self._invalidate_versioned()
+        self.time_index.invalidate()
+        self.frame_cache.invalidate(self.path)
         try:
             if self.test is not False:
                 self.test.close()
@@ -188,6 +252,8 @@ class CoreFile(object):
         if not self.path:
             return False
         kw = {}
+        # Closing stops write-behind: restart it with the same settings
+        buf = self.write_buffer
         if self.test:
             try:
                 kw['mode'] = self.test.mode
@@ -202,6 +268,11 @@ class CoreFile(object):
         if mode:
             kw['mode'] = mode
         self.open_file(self.path, **kw)
+        if buf and not self.write_buffer:
+            self.start_write_behind(interval=buf.interval,
+                                    flush_bytes=buf.flush_bytes,
+                                    max_bytes=buf.max_bytes,
+                                    retries=buf.retries)
         return True
 
     ######################
@@ -240,8 +311,9 @@ class CoreFile(object):
         return csutil.xmlrpcSanitize(r)
 
     @lockme()
-    def set_node_attr(self, *a, **kw):
-        return self.test.set_node_attr(*a, **kw)
+    def set_node_attr(self, where, attrname, attrvalue, name=None):
+        self._own_node(where, name)
+        return self.test.set_node_attr(where, attrname, attrvalue, name=name)
 
     @lockme()
     def get_attributes(self, where, name=None):
@@ -256,6 +328,8 @@ class CoreFile(object):
     def _set_attributes(self, where, name=None, attrs={}):
         """Non-locking call to set_node_attr on `where` with a dict of `attrs`.
         Optionally accepts leaf `name`."""
+        if attrs:
+            self._own_node(where, name)
         for k, v in attrs.items():
             self.log.debug('setting node attr', where, name, k, repr(v))
             self.test.set_node_attr(where, k, v, name=name)
@@ -265,28 +339,126 @@ class CoreFile(object):
         """Locking call to _set_attributes"""
         return self._set_attributes(*a, **kw)
 
+    @lockme()
+    def del_attributes(self, where, names, name=None):
+        """Delete attributes `names` of node `where`, if present.
+        Optionally accepts leaf `name`."""
+        present = self._get_node(where, name)._v_attrs._v_attrnamesuser
+        names = [k for k in names if k in present]
+        if names:
+            self._own_node(where, name)
+        for k in names:
+            self.test.del_node_attr(where, k, name=name)
+        return len(names)
+
     @lockme()
     def len(self, where):
         n = self._get_node(where)
         r = int(n.nrows)
         return r
 
-    @lockme()
-    def append_to_node(self, where, data):
+    def _append_data(self, where, data):
+        """Append data to node located in `where`, raising any error"""
+        n = self._own_node(where)
+        r = n.append(data)
+        self._written(where, n)
+        return r
+
+    def _append_to_node(self, where, data):
         """Append data to node located in `where`"""
         if self.test is False:
             self.log.warning('Append error: Node not found', where)
             return False
         r = False
         try:
-            n = self._get_node(where)
-            r = n.append(data)
+            r = self._append_data(where, data)
 #			n.close()
         except:
             self.log.error('Exception appending to', where, type(data), data, repr(data))
             print_exc()
         return r
 
+    @lockme()
+    def append_to_node_now(self, where, data):
+        """Append data to node located in `where`, bypassing the write-behind buffer"""
+        return self._append_to_node(where, data)
+
+    def append_to_node(self, where, data):
+        """Append data to node located in `where`.
+        If write-behind is enabled, data is queued and written later."""
+        buf = self.write_buffer
+        if buf:
+            if buf.put(where, data):
+                return True
+            # Buffer stopped meanwhile: write synchronously after its pending data
+            buf.sync()
+        return self.append_to_node_now(where, data)
+
+    def _append_rows(self, where, rows, times=None):
+        """Append each element of `rows` as a new row of the node located in `where`
+        (VLArray nodes only accept one row per append).
+        `times` are appended to the persistent time index of the node."""
+        n = self._own_node(where)
+        for row in rows:
+            n.append(row)
+        self._written(where, n)
+        # The persistent time index is maintained by DataOperator, if mixed in
+        append_index = getattr(self, '_append_time_index', None)
+        if times and append_index:
+            append_index(where, times)
+        return len(rows)
+
+    @lockme()
+    def append_rows_now(self, *a, **k):
+        """Append rows within a single lock acquisition, bypassing the write-behind buffer"""
+        return self._append_rows(*a, **k)
+
+    def append_rows(self, where, rows, times=None):
+        """Append `rows` and their `times` to the node located in `where`.
+        If write-behind is enabled, rows are queued and written later."""
+        buf = self.write_buffer
+        if buf:
+            if buf.put(where, rows, rows=True, times=times):
+                return True
+            buf.sync()
+        return self.append_rows_now(where, rows, times)
+
+    def write_buffered(self, where, rows, chunks, times):
+        """Write data coalesced by the write-behind buffer.
+        Errors are raised, so that the buffer keeps the data and retries."""
+        self._lock.acquire()
+        try:
+            if rows:
+                return self._append_rows(where, chunks, times)
+            if len(chunks) > 1 and all(isinstance(c, np.ndarray) for c in chunks):
+                chunks = [np.concatenate(chunks)]
+            for data in chunks:
+                self._append_data(where, data)
+            return True
+        finally:
+            self._lock.release()
+
+    def start_write_behind(self, **kw):
+        """Queue all appends and write them from a dedicated flusher thread.
+        Keywords are passed to WriteBuffer (interval, flush_bytes, max_bytes, retries)."""
+        if not self.write_buffer:
+            self.write_buffer = WriteBuffer(self.write_buffered, **kw)
+        return True
+
+    def stop_write_behind(self):
+        """Write all pending data and go back to synchronous appends"""
+        if not self.write_buffer:
+            return False
+        buf = self.write_buffer
+        self.write_buffer = False
+        return buf.stop()
+
+    def sync(self):
+        """Barrier: wait until all appends queued so far are written to the file"""
+        if self.write_buffer:
+            self.write_buffer.sync()
+        return True
+
     @lockme()
     def list_nodes(self, *a, **k):
         """Return a list of node names"""
@@ -342,6 +514,7 @@ class CoreFile(object):
     @lockme()
     def create_group(self, *a, **kw):
         g = self.test.create_group(*a, **kw)
+        self._invalidate_versioned(g._v_pathname)
         return True
 
     @lockme()
@@ -374,17 +547,34 @@ class CoreFile(object):
             return False
 
         self.test.remove_node(path, recursive=recursive)
+        self.node_cache.invalidate(path)
+        self._invalidate_versioned(path)
+        self.time_index.invalidate(path)
+        self.frame_cache.invalidate(self.path, path)
+        # Remove persistent time index and decimation pyramid
+        for side in [tindex_path(path)] + lod_paths(path):
+            self.time_index.invalidate(side)
+            if self._has_node(side):
+                self.test.remove_node(side, recursive=True)
         # Clean the cached header
-        path += '/'
+        path = path.rstrip('/')
         for k, v in self._header.items():
-            if path not in v:
-                continue
-            v.remove(path)
-            self._header[k] = v
-            break
+            gone = [p for p in v if p == path or p.startswith(path + '/')]
+            if gone:
+                drop = set(gone)
+                self._header[k] = [p for p in v if p not in drop]
+                self._remove_userdata_header(k, gone)
 #		self.test.flush()
         return True
 
+    def _append_userdata_header(self, cls_name, paths):
+        """Record new header `paths` in a persistent header cache. No lock."""
+        return False
+
+    def _remove_userdata_header(self, cls_name, paths):
+        """Record removed header `paths` in a persistent header cache. No lock."""
+        return False
+
     @unlockme
     def filenode_write(self, path, data='', obj=None, mode='w'):
         # TODO: better use of the mode param
@@ -398,10 +588,14 @@ class CoreFile(object):
             self.log.debug('removing old node', path)
             t0 = time()
             attrs = self.get_attributes(path)
+            # Summary of the old content would be stale
+            attrs = dict((k, v) for k, v in attrs.items() if not k.startswith('summary_'))
             self.log.debug('saved attributes', attrs)
             self.remove_node(path)
         self.log.debug('filenode_write lock')
         self._lock.acquire()
+        self.node_cache.invalidate(path)
+        self._invalidate_versioned(path)
         where = os.path.dirname(path)
         name = os.path.basename(path)
         self.log.debug('newNode', path, where, name)
@@ -470,11 +664,40 @@ class CoreFile(object):
             version = self.version or ''
         if version and not version.startswith('/'):
             version = '/'+version
-        if version and not path.startswith(version):
+        if not version or path.startswith(version):
+            return path
+        paths = self._version_paths.setdefault(version, {})
+        r = paths.get(path, None)
+        if r is None:
             path1 = version + path
-            if self._has_node(path1):
-                return path1
-        return path
+            r = path1 if self._has_node(path1) else path
+            paths[path] = r
+        return r
+
+    def _invalidate_versioned(self, path=False):
+        """Forget resolutions affected by creation or removal of node `path`, or all if False"""
+        if path is False:
+            self._version_paths = {}
+            self._owned = set()
+            return True
+        p = path.rstrip('/')
+        self._owned = set(k for k in self._owned if k != p and not k.startswith(p + '/'))
+        if not path.startswith('/ver_'):
+            return False
+        version = '/' + path.split('/')[1]
+        paths = self._version_paths.get(version, False)
+        if not paths:
+            return False
+        orig = path[len(version):].rstrip('/')
+        if not orig:
+            paths.clear()
+            return True
+        for key in list(paths.keys()):
+            k = key.rstrip('/')
+            # The node itself, its children and its parent groups
+            if k == orig or k.startswith(orig + '/') or orig.startswith(k + '/'):
+                paths.pop(key)
+        return True
 
     @lockme()
     def versioned(self, path, version=False):
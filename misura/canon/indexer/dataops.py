@@ -4,18 +4,31 @@
 API for common data operations on local or remote HDF files.
 """
 
+import os
 from scipy.interpolate import UnivariateSpline, interp1d
 import numpy as np
 import functools
 import numexpr as ne
+import tables
 from .. import csutil
 from ..csutil import lockme
 from .. import reference
+from ..parameters import cfilter
+from .timeindex import has_time_column, nearest_indexes, tindex_path
+from . import kernels
+from . import lod
+from .framecache import copy_frame
 ne.set_num_threads(8)
 
 
 class DataOperator(object):
     _zerotime = -1
+    block_chunks = 32
+    """Number of HDF5 chunks read at once by blockwise operations"""
+    lod_block = 4096
+    """Maximum number of buckets decimated at once while updating pyramids"""
+    frame_read_ahead = 2
+    """Number of frames decoded in background before and after each get_frame"""
 
     @property
     def zerotime(self):
@@ -59,14 +72,19 @@ No data will be evaluate if older than zerotime."""
         path = self._versioned(path)
         n = self._get_node(path)
         
-        # Convert to regular array
-        if not raw and len(n):
-            try:
-                n = n[:].view(np.float64).reshape(n.shape + (-1,))
-            except:
-                raise
+        slc = None
         if idx_or_slice is not None:
             slc = csutil.toslice(idx_or_slice)
+        # Read only the requested rows before converting
+        if not raw and len(n) and isinstance(slc, (int, np.integer, slice)):
+            rows = n[slc]
+            if not isinstance(slc, slice):
+                return np.array([rows], dtype=n.dtype).view(np.float64)
+            return rows.view(np.float64).reshape(rows.shape + (-1,))
+        # Convert to regular array
+        if not raw and len(n):
+            n = n[:].view(np.float64).reshape(n.shape + (-1,))
+        if slc is not None:
             n = n[slc]
         return n
 
@@ -141,89 +159,109 @@ No data will be evaluate if older than zerotime."""
             if ur + lr < 0.0000000001:
                 return None
 
-    @lockme()
-    def search(self, path, op, cond='x==y', pos=-1, start_time=0, end_time=-1):
-        """Search dataset path with operator `op` for condition `cond`"""
-        self.log.debug('searching in ', path, cond)
-        tab = self._get_node(path)
-        x, y = tab.cols.t, tab.cols.v
+    def _search_window(self, path, start_time=0, end_time=-1):
+        """Returns the start and end indexes of `path` corresponding to `start_time`, `end_time`"""
         if start_time == 0:
             start_index = 0
         else:
             start_index = self._get_time(path, start_time)
         if end_time == -1:
-            end_index = len(y)
+            end_index = self._get_node(path).nrows
         else:
             end_index = self._get_time(path, end_time)
-        y1, m = op(y[start_index:end_index])
-        last = -1
-        # Handle special cases
-        if cond == 'x>y':  # raises
-            if y[start_index] > m:
-                last = start_index
-            cond = 'y>m'
-        elif cond == 'x<y':  # drops
-            if y[start_index] < m:
-                last = start_index
-            cond = 'y<m'
-        elif cond == 'x~y':
-            #FIXME: inefficient, restore find_nearest_cond!
-            d = abs(y1-m)
-            last = np.where(d==min(d))[0][0]
-            #last = self.find_nearest_cond(
-            #    tab, path, m, start_time=start_time, end_time=end_time)
-            if last is None:
-                return False
-            last += start_index
-        else:
-            cond = 'y==m'
-
-        if last < 0:
-            condvars = {'y':y, 'm': m}
-            last = list(tab.get_where_list(cond, condvars=condvars, 
-                                           start=start_index,
-                                           stop=end_index))
-            last0 = last[:]
-            # WARNING: start selector is not working.
-            # TODO: Send bug to pytables!
-            while start_index:
-                if len(last) == 0:
-                    last = None
-                    break
-                if last[0] < start_index:
-                    last.pop(0)
-                    continue
+        return start_index, end_index
+
+    def _iter_blocks(self, path, start_index, end_index, field='v'):
+        """Yields (offset, values) blocks of `field` from `start_index` to `end_index`,
+        aligned to the HDF5 chunks of node `path`."""
+        tab = self._get_node(path)
+        size = tab.chunkshape[0] * self.block_chunks
+        i = start_index
+        while i < end_index:
+            j = min((i // size + 1) * size, end_index)
+            yield i, tab.read(i, j, field=field)
+            i = j
+
+    def _reduce(self, path, red, start_time=0, end_time=-1, field='v'):
+        """Feed Reduction `red` with the blocks of `path` in the time window"""
+        start_index, end_index = self._search_window(path, start_time, end_time)
+        for offset, y in self._iter_blocks(path, start_index, end_index, field):
+            red.update(y, offset)
+            if red.done:
                 break
+        return red.result()
 
-            if last is None or len(last) == 0:
-                self.log.debug('DataOps.search FAILED', path, cond, start_index, end_index, m, len(y), last0, last)
-                return False
-            last = last[0]
-        return last, x[last], y[last]
+    @lockme()
+    def reduce(self, path, name, val=None, start_time=0, end_time=-1, field='v'):
+        """Blockwise out-of-core reduction `name` of dataset `path` in the time window.
+        min, max, mean, std return a value.
+        argmin, argmax, nearest, equals, drops, rises return index, time, value."""
+        red = kernels.reduction(name, val)
+        r = self._reduce(path, red, start_time, end_time, field)
+        if r is None:
+            return False
+        if name in ('mean', 'std'):
+            n, mean, std = r
+            return mean if name == 'mean' else std
+        idx, v = r
+        if name in ('min', 'max'):
+            return v
+        return idx, self._get_node(path).cols.t[idx], v
 
+    def _search(self, path, kernel, val=None, start_time=0, end_time=-1):
+        """Search dataset `path` with the vectorized `kernel` in a single blockwise pass over the time window.
+        Returns index, time and value of the found point, or False."""
+        red = kernels.search_reduction(kernel, val)
+        r = self._reduce(path, red, start_time, end_time)
+        return self._search_result(path, kernel, r, start_time, end_time, val)
+
+    def _search_result(self, path, kernel, r, start_time, end_time, val):
+        """Build the index, time, value result of a search reduction"""
+        if r is None:
+            self.log.debug('DataOps.search FAILED', path, kernel.__name__,
+                           start_time, end_time, val)
+            return False
+        idx, v = r
+        return idx, self._get_node(path).cols.t[idx], v
+
+    @lockme()
+    def search(self, path, op, cond='x==y', pos=-1, start_time=0, end_time=-1):
+        """Search dataset path with operator `op` for condition `cond`.
+        `op(y)` returns (y, reference value) and is called once on the whole time window,
+        so the reference value can depend on the data.
+        Built-in searches (max, min, nearest, equals, drops, rises) are blockwise instead."""
+        self.log.debug('searching in ', path, cond)
+        kernel = kernels.conditions.get(cond, kernels.equals)
+        start_index, end_index = self._search_window(path, start_time, end_time)
+        y = self._get_node(path).read(start_index, end_index, field='v')
+        y1, m = op(y)
+        i = kernel(y1 if kernel is kernels.nearest else y, m)
+        r = None if i is None else (start_index + i, y[i])
+        return self._search_result(path, kernel, r, start_time, end_time, m)
+
+    @lockme()
     def max(self, path, start_time=0, end_time=-1):
-        op = lambda y: (y, max(y))
-        return self.search(path, op, cond='x==y', 
-                           start_time=start_time,
-                           end_time=end_time)
+        return self._search(path, kernels.argmax,
+                            start_time=start_time,
+                            end_time=end_time)
 
+    @lockme()
     def min(self, path, start_time=0, end_time=-1):
-        op = lambda y: (y, min(y))
-        return self.search(path, op, cond='x==y', 
-                           start_time=start_time,
-                           end_time=end_time)
+        return self._search(path, kernels.argmin,
+                            start_time=start_time,
+                            end_time=end_time)
 
+    @lockme()
     def nearest(self, path, val, start_time=0, end_time=-1):
-        op = lambda y: (y, val)
-        return self.search(path, op, cond='x~y', 
-                           start_time=start_time,
-                           end_time=end_time)
+        return self._search(path, kernels.nearest, val,
+                            start_time=start_time,
+                            end_time=end_time)
 
+    @lockme()
     def equals(self, path, val, tol=10**-12, start_time=0, end_time=-1):
-        op = lambda y: (y, val)
-        r = self.search(path, op, 
-                           start_time=start_time,
-                           end_time=end_time)
+        r = self._search(path, kernels.equals, val,
+                         start_time=start_time,
+                         end_time=end_time)
         if not r:
             return False
         i, xi, yi = r
@@ -231,24 +269,26 @@ No data will be evaluate if older than zerotime."""
             return False
         return i, xi, yi
 
+    @lockme()
     def drops(self, path, val, start_time=0, end_time=-1):
-        cond = 'x<y'
-        op = lambda y: (y, val)
         self.log.debug('drops', path, val)
-        return self.search(path, op, cond, pos=0, start_time=start_time, 
-                           end_time=end_time)
+        return self._search(path, kernels.drops, val,
+                            start_time=start_time,
+                            end_time=end_time)
 
+    @lockme()
     def rises(self, path, val, start_time=0, end_time=-1):
-        cond = 'x>y'
-        op = lambda y: (y, val)
         self.log.debug('rises', path, val)
-        return self.search(path, op, cond, pos=0,  
-                           start_time=start_time,
-                           end_time=end_time)
+        return self._search(path, kernels.rises, val,
+                            start_time=start_time,
+                            end_time=end_time)
 
     def _get_time(self, path, t, get=False, seed=None):
         """Optimized search of the nearest index to time `t` using the getter function `get` and starting from `seed` index."""
         n = self._get_node(path)
+        tcol = self._time_column(path, n, get)
+        if tcol is not None:
+            return int(nearest_indexes(tcol, t))
         if get is False:
             get = lambda i: n[i][0]
         else:
@@ -261,6 +301,149 @@ No data will be evaluate if older than zerotime."""
     def get_time(self, *a, **k):
         return self._get_time(*a, **k)
 
+    def _get_times(self, path, times, get=False):
+        """Batch search of the nearest indexes to each time in `times`"""
+        n = self._get_node(path)
+        tcol = self._time_column(path, n, get)
+        if tcol is None:
+            return [self._get_time(path, t, get=get) for t in times]
+        return [int(i) for i in nearest_indexes(tcol, times)]
+
+    @lockme()
+    def get_times(self, *a, **k):
+        return self._get_times(*a, **k)
+
+    def _time_column(self, path, node, get=False):
+        """Returns the cached time column of `node`,
+        or None if it cannot be indexed with the getter function `get`."""
+        # Tables with a time column
+        if get in (False, reference.Reference.unbound['decode_time']) and has_time_column(node):
+            return self.time_index.column(node, path)
+        # Variable-length nodes with a complete persistent time index
+        if get is not False and isinstance(node, tables.VLArray):
+            tpath = tindex_path(path)
+            if not self._has_node(tpath):
+                return None
+            tnode = self._get_node(tpath)
+            if tnode.nrows < node.nrows:
+                return None
+            read = lambda start: tnode.read(start=start, stop=node.nrows)
+            return self.time_index.column(node, path, read)
+        return None
+
+    def _rebuild_time_index(self, path, get=None):
+        """Extend the persistent time index of variable-length node `path`
+        by decoding the times of all rows it does not cover with `get`
+        (default: its reference class). Returns the number of indexed rows."""
+        if not self.writable():
+            return False
+        node = self._get_node(path)
+        if get is None:
+            get = self._reference_class(node, reference.VariableLength).unbound['decode_time']
+        tpath = tindex_path(path)
+        first = self._get_node(tpath).nrows if self._has_node(tpath) else 0
+        if first > node.nrows:
+            self.test.remove_node(tpath)
+            first = 0
+        times = [get(node, i) for i in range(first, node.nrows)]
+        if times:
+            self._append_time_index(path, times, first)
+        self.time_index.invalidate(path)
+        return len(times)
+
+    @lockme()
+    def rebuild_time_index(self, *a, **k):
+        return self._rebuild_time_index(*a, **k)
+
+    def _append_time_index(self, path, times, start=None):
+        """Append `times` to the persistent time index of variable-length node `path`.
+        `start` is the row index of the first time (default: the last len(times) rows).
+        The index is only extended if it is consistent with `start`."""
+        if not self.writable():
+            return False
+        if start is None:
+            start = self._get_node(path).nrows - len(times)
+        tpath = tindex_path(path)
+        if self._has_node(tpath):
+            tnode = self._get_node(tpath)
+        elif start == 0:
+            where, name = os.path.split(tpath)
+            tnode = self.test.create_earray(where, name,
+                                            atom=tables.Float64Atom(),
+                                            shape=(0,),
+                                            filters=cfilter,
+                                            createparents=True)
+        else:
+            return False
+        if tnode.nrows != start:
+            return False
+        tnode.append(np.asarray(times, dtype=np.float64))
+        return True
+
+    @lockme()
+    def append_time_index(self, *a, **k):
+        return self._append_time_index(*a, **k)
+
+    def _update_lod(self, path):
+        """Extend the decimation pyramid of Array node `path` with all complete buckets.
+        Returns the number of new buckets."""
+        if not self.writable():
+            return False
+        src = self._get_node(path)
+        if 'v' not in getattr(src, 'colnames', ()):
+            return False
+        n = 0
+        for level in range(1, lod.levels + 1):
+            dpath = lod.lod_path(path, level)
+            if self._has_node(dpath):
+                dest = self._get_node(dpath)
+            else:
+                where, name = os.path.split(dpath)
+                dest = self.test.create_table(where, name,
+                                              description=np.dtype(lod.fields),
+                                              filters=cfilter,
+                                              createparents=True)
+            while True:
+                done = dest.nrows * lod.factor
+                k = min((src.nrows - done) // lod.factor, self.lod_block)
+                if k <= 0:
+                    break
+                dest.append(lod.decimate(src.read(done, done + k * lod.factor)))
+                n += k
+            src = dest
+        return n
+
+    @lockme()
+    def update_lod(self, *a, **k):
+        return self._update_lod(*a, **k)
+
+    def _query_lod(self, path, start_index, end_index, max_points):
+        """Read at most `max_points` (t, v, min, max) rows representing `path`
+        from `start_index` to `end_index`, from the most suitable level of its decimation pyramid.
+        Raw rows not covered by the pyramid are reduced on the fly, with min=max=v at level 0.
+        Rows are finally merged into exactly `max_points` buckets if they are more.
+        The pyramid is only extended by commit and update_lod."""
+        n = self._get_node(path)
+        if 'v' not in getattr(n, 'colnames', ()):
+            return n[start_index:end_index]
+        if end_index <= start_index:
+            return np.empty(0, dtype=lod.fields)
+        level = lod.pick_level(end_index - start_index, max_points)
+        f = lod.factor**level
+        arr = []
+        covered = start_index
+        lpath = lod.lod_path(path, level)
+        if level and self._has_node(lpath):
+            lnode = self._get_node(lpath)
+            stop = min((end_index + f - 1) // f, lnode.nrows)
+            if stop > start_index // f:
+                arr = [lnode[start_index // f:stop]]
+                covered = stop * f
+        if covered < end_index:
+            # Rows not yet decimated by commit/update_lod
+            arr.append(lod.reduce(lod.expand(n[covered:end_index]), f))
+        return lod.resample(np.concatenate(arr), max_points)
+
     @lockme()
     def get_time_profile(self, path, t):
         return self._get_time(path, t, get=reference.Profile.unbound['decode_time'])
@@ -269,6 +452,84 @@ No data will be evaluate if older than zerotime."""
     def get_time_cumulative_profile(self, path, t):
         return self._get_time(path, t, get=reference.CumulativeProfile.unbound['decode_time'])
     
+    def _reference_class(self, node, default=None):
+        """Reference class used to encode `node`"""
+        name = getattr(node.attrs, '_reference_class', None)
+        if isinstance(name, list):
+            name = name[0]
+        if name is None:
+            return default
+        return getattr(reference, name, default)
+
+    def _decode_frame(self, path, idx, decode=None):
+        """Read and decode row `idx` of `path` with `decode`, or with its reference class.
+        The row is returned undecoded if its class cannot be resolved."""
+        node = self._get_node(path)
+        if decode is None:
+            cls = self._reference_class(node)
+            if cls is None:
+                return node[idx]
+            decode = cls.decode
+        return decode(node[idx])
+
+    @lockme()
+    def decode_frame(self, *a, **k):
+        return self._decode_frame(*a, **k)
+
+    def prefetch_frame(self, path, idx, decode=None):
+        """Background decoding of a frame, skipped if the file was closed meanwhile"""
+        if not self.test or not self.test.isopen:
+            return None
+        return self.decode_frame(path, idx, decode)
+
+    def _get_frame(self, path, idx, decode=None):
+        """Decoded row `idx` of variable-length node `path`, through the frame cache.
+        Neighbouring frames are decoded in background."""
+        nrows = self._get_node(path).nrows
+        if idx < 0:
+            idx += nrows
+        key = (self.path, path, idx)
+        frame = self.frame_cache.get(key)
+        if frame is None:
+            frame = self._decode_frame(path, idx, decode)
+            self.frame_cache.put(key, frame)
+        for i in range(1, self.frame_read_ahead + 1):
+            for j in (idx + i, idx - i):
+                if 0 <= j < nrows:
+                    self.frame_cache.prefetch((self.path, path, j),
+                                              functools.partial(self.prefetch_frame, path, j, decode))
+        return copy_frame(frame)
+
+    @lockme()
+    def get_frame(self, *a, **k):
+        return self._get_frame(*a, **k)
+
+    def _get_profiles(self, path, start_time=0, end_time=-1, step=None):
+        """Read and decode all profiles of `path` from `start_time` to `end_time` included,
+        or the profiles nearest to each `step` seconds.
+        Returns times, widths, heights, offsets and concatenated x, y coords:
+        coords of profile i are x[offsets[i]:offsets[i+1]]."""
+        node = self._get_node(path)
+        cls = self._reference_class(node, reference.CumulativeProfile)
+        get = cls.unbound['decode_time']
+        if not node.nrows:
+            return cls.decode_rows([])
+        if end_time < 0:
+            end_time = get(node, node.nrows - 1)
+        si, ei = self._get_times(path, [start_time, end_time], get)
+        if step:
+            times = np.arange(get(node, si), get(node, ei) + step / 2., step)
+            idx = self._get_times(path, times, get)
+            idx = np.unique(idx)
+            rows = [node[i] for i in idx]
+        else:
+            rows = node.read(si, ei + 1)
+        return cls.decode_rows(rows)
+
+    @lockme()
+    def get_profiles(self, *a, **k):
+        return self._get_profiles(*a, **k)
+
     @lockme()
     def get_time_func(self, path, t, func):
         return self._get_time(path, t, get=func)   
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""LRU cache of decoded frames (images, profiles, binary objects) with background read-ahead"""
+import threading
+from collections import OrderedDict
+from traceback import print_exc
+try:
+    from Queue import Queue, Full
+except:
+    from queue import Queue, Full
+import numpy as np
+
+
+def frame_size(frame):
+    """Approximate memory size of a decoded `frame`"""
+    if isinstance(frame, np.ndarray):
+        return frame.nbytes
+    if isinstance(frame, (list, tuple)):
+        return sum(frame_size(f) for f in frame)
+    if isinstance(frame, (bytes, bytearray)):
+        return len(frame)
+    return 8
+
+
+def copy_frame(frame):
+    """Copy arrays contained in `frame`, so callers cannot alter cached data"""
+    if isinstance(frame, np.ndarray):
+        return frame.copy()
+    if isinstance(frame, tuple):
+        return tuple(copy_frame(f) for f in frame)
+    if isinstance(frame, list):
+        return [copy_frame(f) for f in frame]
+    return frame
+
+
+class FrameCache(object):
+
+    """Least recently used cache of decoded frames keyed by (file, path, index),
+    bounded by the total size of cached frames."""
+
+    def __init__(self, budget=2**26, queue_size=64):
+        self.budget = budget
+        """Maximum size in bytes of cached frames"""
+        self.frames = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.queue = Queue(queue_size)
+        self.generation = 0
+        """Incremented on invalidation, cancelling pending read-ahead"""
+        self.thread = False
+
+    def get(self, key):
+        """Returns the cached frame for `key`, or None"""
+        with self._lock:
+            entry = self.frames.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            # Mark as most recently used
+            self.frames[key] = entry
+            return entry[0]
+
+    def put(self, key, frame):
+        """Cache `frame` for `key`, evicting least recently used frames beyond budget"""
+        with self._lock:
+            return self._put(key, frame)
+
+    def _put(self, key, frame):
+        size = frame_size(frame)
+        if size > self.budget:
+            return False
+        old = self.frames.pop(key, None)
+        if old is not None:
+            self.size -= old[1]
+        self.frames[key] = (frame, size)
+        self.size += size
+        while self.size > self.budget:
+            k, (f, s) = self.frames.popitem(last=False)
+            self.size -= s
+        return True
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self.frames
+
+    def invalidate(self, filename=False, path=False):
+        """Forget frames of `filename`, and optionally of node `path` and its children.
+        If no filename is specified, forget all frames.
+        Pending read-ahead is cancelled."""
+        with self._lock:
+            self.generation += 1
+            if filename is False:
+                self.frames = OrderedDict()
+                self.size = 0
+                return True
+            for key in list(self.frames.keys()):
+                if key[0] != filename:
+                    continue
+                if path and not (key[1] == path or key[1].startswith(path.rstrip('/') + '/')):
+                    continue
+                self.size -= self.frames.pop(key)[1]
+        return True
+
+    def prefetch(self, key, load):
+        """Decode frame `key` in background by calling `load()`, if not already cached"""
+        with self._lock:
+            if key in self.frames:
+                return False
+            generation = self.generation
+        if not self.thread:
+            self.thread = threading.Thread(target=self.run, name='FrameCache')
+            self.thread.daemon = True
+            self.thread.start()
+        try:
+            self.queue.put_nowait((key, load, generation))
+        except Full:
+            return False
+        return True
+
+    def run(self):
+        """Read-ahead thread loop"""
+        while True:
+            key, load, generation = self.queue.get()
+            with self._lock:
+                if generation != self.generation or key in self.frames:
+                    continue
+            try:
+                frame = load()
+            except:
+                print_exc()
+                continue
+            if frame is None:
+                continue
+            with self._lock:
+                # Discard frames decoded before an invalidation
+                if generation == self.generation:
+                    self._put(key, frame)
+
+
+frame_cache = FrameCache()
+"""Frame cache shared by all files"""
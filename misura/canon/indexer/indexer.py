@@ -16,6 +16,8 @@ import functools
 import threading
 import multiprocessing
 import datetime
+from collections import OrderedDict
+from contextlib import contextmanager
 
 from misura.canon.csutil import unlockme, enc_options, sharedProcessResources
 
@@ -24,10 +26,12 @@ from tables.nodes import filenode
 from .. import csutil
 
 from .filemanager import FileManager
-from misura.canon.indexer.interface import SharedFile
+from misura.canon.indexer.interface import SharedFile, read_summary
 from misura.canon.plugin import NullTasks
 
 from . import toi
+from . import scan
+from .watcher import Watcher, default_backend
 
 testColumn = ('file', 'serial', 'uid', 'id', 'zerotime', 'instrument',
               'flavour', 'name', 'elapsed', 'nSamples', 'comment', 'verify')
@@ -52,6 +56,8 @@ errorsTableDef = '''(file text unique, error text, time real)'''
                                    
 incrementalIdsTableDef = '''(incremental_id INTEGER PRIMARY KEY AUTOINCREMENT, uid text unique)'''
 modifyDatesTableDef = '''(modify_date integer, file text unique)'''
+scanFilesTableDef = '''(file text primary key, size integer, mtime real, inode integer)'''
+scanDirsTableDef = '''(dir text primary key, parent text, mtime real)'''
 
 syncTableDef = '''(file text, serial text, uid text primary key, id text,
                    zerotime text, instrument text, flavour text, name text,
@@ -188,11 +194,42 @@ def create_tables(cur):
         "create table if not exists incremental_ids " + incrementalIdsTableDef)
     cur.execute(
         "create table if not exists modify_dates " + modifyDatesTableDef)
+    cur.execute("create table if not exists scan_files " + scanFilesTableDef)
+    cur.execute("create table if not exists scan_dirs " + scanDirsTableDef)
     
     #cur.execute('create index if not exists idx_test_instrument on test(instrument)')
     cur.execute('create index if not exists idx_test_zerotime on test(zerotime)')
     cur.execute('create index if not exists idx_test_uid on test(uid)')
 
+
+class RowRecorder(object):
+    """Cursor-like object recording executed statements and values,
+    so index rows can be collected outside of the database process."""
+
+    def __init__(self):
+        self.rows = []
+
+    def execute(self, cmd, vals=()):
+        self.rows.append((cmd, tuple(vals)))
+        return self
+
+    def executemany(self, cmd, vals):
+        self.rows += [(cmd, tuple(v)) for v in vals]
+        return self
+
+    def fetchall(self):
+        return []
+
+
+def extract_file(args):
+    """Process pool worker: read all index rows of a test file in read-only mode.
+    `args` is a (dbpath, file_path) tuple. Returns (file_path, rows, error)."""
+    dbpath, file_path = args
+    idx = Indexer(paths=[])
+    idx.dbPath = dbpath
+    return idx.extract_rows(file_path)
+
+
 class Indexer(object):
     public = ['rebuild', 'searchUID', 'update', 'header', 
               'query', 'remove_uid', 'get_len', 'list_tests', 'get_dbpath',
@@ -201,8 +238,15 @@ class Indexer(object):
 #   conn=False
     addr = 'LOCAL'
     initialized = False
-
-    def __init__(self, dbPath=False, paths=[], log=False):
+    watcher = False
+    persistent = False
+    """Keep one connection per thread open across calls, in WAL journal mode.
+    WAL is unsafe on network shares: other connections reset the default journal mode."""
+    cached_statements = 256
+
+    def __init__(self, dbPath=False, paths=[], log=False, persistent=None):
+        if persistent is not None:
+            self.persistent = persistent
         self._lock = FileSystemLock()
         self.tasks = NullTasks()
         self.threads = {}
@@ -262,8 +306,22 @@ class Indexer(object):
             except sqlite3.ProgrammingError:
                 conn = False
         if not conn:
-            conn = sqlite3.connect(
-                self.dbPath, detect_types=sqlite3.PARSE_DECLTYPES)
+            self.prune_threads()
+            if self.persistent:
+                conn = sqlite3.connect(self.dbPath, detect_types=sqlite3.PARSE_DECLTYPES,
+                                       cached_statements=self.cached_statements,
+                                       check_same_thread=False)
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('PRAGMA synchronous=NORMAL')
+            else:
+                conn = sqlite3.connect(
+                    self.dbPath, detect_types=sqlite3.PARSE_DECLTYPES)
+                # Journal mode is stored in the database: undo a previous persistent use
+                if conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal':
+                    try:
+                        conn.execute('PRAGMA journal_mode=DELETE')
+                    except sqlite3.OperationalError:
+                        self.log.debug('Keeping WAL journal mode', format_exc())
             cur = conn.cursor()
             self.threads[tid()] = (conn, cur)
         if not self.initialized:
@@ -275,14 +333,20 @@ class Indexer(object):
             self.initialized = True
         return True
 
-    def close_db(self, optimize=False):
+    def close_db(self, optimize=False, force=False):
         """Close the database connection for the caller thread.
-        `optimize`=True runs query optimizations"""
-        conn, cur = self.threads.pop(tid(), (0, 0))
+        `optimize`=True runs query optimizations.
+        Persistent connections are kept open, unless `force`=True."""
+        if self.persistent and not force:
+            conn, cur = self.threads.get(tid(), (0, 0))
+        else:
+            conn, cur = self.threads.pop(tid(), (0, 0))
         if optimize and cur and conn:
             self.log.debug('Optimizing last query')
             cur.execute('PRAGMA optimize')
             conn.commit()
+        if self.persistent and not force:
+            return True
         if cur:
             cur.close()
         if conn:
@@ -290,8 +354,59 @@ class Indexer(object):
         
         return True
 
+    def prune_threads(self):
+        """Close connections left open by threads which already exited"""
+        alive = set(th.ident for th in threading.enumerate())
+        for key in list(self.threads.keys()):
+            if key in alive:
+                continue
+            conn, cur = self.threads.pop(key)
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                # Not shareable across threads: released by garbage collection
+                pass
+        return True
+
+    def close_all_db(self):
+        """Close connections of all threads"""
+        for key in list(self.threads.keys()):
+            conn, cur = self.threads.pop(key)
+            try:
+                cur.close()
+                conn.close()
+            except sqlite3.ProgrammingError:
+                self.log.debug('Closing db', format_exc())
+        return True
+
+    @contextmanager
+    def transaction(self):
+        """Locked context yielding a cursor. Commits on exit, or rolls back on error."""
+        if not self._lock.acquire(timeout=10):
+            raise BaseException('Impossible to lock database')
+        try:
+            self.open_db()
+            try:
+                yield self.cur
+                self.conn.commit()
+            except:
+                self.conn.rollback()
+                raise
+        finally:
+            try:
+                self.close_db()
+            finally:
+                self._lock.acquire(False)
+                try:
+                    self._lock.release()
+                except:
+                    self.log.info('Releasing lock', format_exc())
+
     def close(self):
-        r = self.close_db()
+        self.stop_watch()
+        r = self.close_db(force=True)
+        if self.persistent:
+            self.close_all_db()
         try:
             self._lock.release()
         except:
@@ -328,6 +443,8 @@ class Indexer(object):
         return self._searchUID(uid, full)
 
     aborted = False
+    rebuild_batch = 200
+    """Number of files written in a single transaction by parallel rebuild"""
 
     def abort(self):
         """Abort current rebuild/refresh process"""
@@ -335,8 +452,10 @@ class Indexer(object):
         self.aborted = True
 
     @unlockme
-    def rebuild(self):
-        """Completely recreate the SQLite Database indexing all test files."""
+    def rebuild(self, parallel=0):
+        """Completely recreate the SQLite Database indexing all test files.
+        `parallel` is the number of worker processes reading test files
+        (True: one per cpu). 0 indexes files one by one in the calling process."""
         self.aborted = False
         if not self.dbPath:
             return False
@@ -360,6 +479,8 @@ class Indexer(object):
         cur.execute("DROP TABLE IF EXISTS sync_approve")
         cur.execute("DROP TABLE IF EXISTS sync_error")
         cur.execute("DROP TABLE IF EXISTS modify_dates")
+        cur.execute("DROP TABLE IF EXISTS scan_files")
+        cur.execute("DROP TABLE IF EXISTS scan_dirs")
         toi.drop_tables(cur)
         conn.commit()
         self.close_db()
@@ -370,17 +491,65 @@ class Indexer(object):
         tests_filenames = self.tests_filenames_sorted_by_date()
         self.tasks.jobs(len(tests_filenames),
                         'Rebuilding database', abort=self.abort)
-        for i, f in enumerate(tests_filenames):
+        if parallel:
+            i = self.rebuild_parallel(tests_filenames, parallel)
             if self.aborted:
                 return 'Aborted. Indexed %i tests.' % i
-            self.appendFile(f, False)
-            self.tasks.job(i, 'Rebuilding database', f)
+        else:
+            for i, f in enumerate(tests_filenames):
+                if self.aborted:
+                    return 'Aborted. Indexed %i tests.' % i
+                self.appendFile(f, False)
+                self.tasks.job(i, 'Rebuilding database', f)
 
         self.recalculate_incremental_ids()
         self.refresh_views()
         self.analyze_queries()
         return 'Done. Found %i tests.' % len(tests_filenames)
 
+    def rebuild_parallel(self, tests_filenames, processes=True):
+        """Read `tests_filenames` in a pool of `processes` and write their rows
+        in batched transactions. Returns the number of processed files.
+        The database is only locked while writing each batch."""
+        if processes is True:
+            processes = multiprocessing.cpu_count()
+        pool = multiprocessing.Pool(processes)
+        jobs = pool.imap(extract_file, [(self.dbPath, f) for f in tests_filenames])
+        rows = []
+        done = 0
+        try:
+            for file_path, file_rows, err in jobs:
+                if self.aborted:
+                    break
+                if err:
+                    self.log.info(err)
+                    rows.append(('INSERT OR REPLACE INTO errors VALUES (?,?,?)',
+                                 (file_path, err, time())))
+                else:
+                    rows += file_rows
+                self.tasks.job(done, 'Rebuilding database', file_path)
+                done += 1
+                if done % self.rebuild_batch == 0:
+                    self.write_rows(rows)
+                    rows = []
+            self.write_rows(rows)
+        finally:
+            pool.terminate()
+            pool.join()
+        return done
+
+    @dbcom
+    def write_rows(self, rows):
+        """Insert (statement, values) `rows` in one transaction,
+        running each distinct statement once with all its values"""
+        groups = OrderedDict()
+        for cmd, vals in rows:
+            groups.setdefault(cmd, []).append(vals)
+        for cmd, vals in groups.items():
+            self.cur.executemany(cmd, vals)
+        self.conn.commit()
+        return len(rows)
+
     @dbcom
     def recalculate_incremental_ids(self):
         self.cur.execute("select uid from test order by zerotime")
@@ -439,11 +608,50 @@ class Indexer(object):
             sh.close(all_handlers=True)
         return r
 
+    def extract_rows(self, file_path):
+        """Read all index rows of `file_path` without writing to the database.
+        Returns (file_path, rows, error), where rows is a list of (statement, values)."""
+        sh = False
+        rows = RowRecorder()
+        try:
+            sh = SharedFile(file_path, mode='r', header=False, load_conf=False)
+            if not getattr(sh.test.root, 'conf', False):
+                self.log.debug('Tree configuration not found', file_path)
+                return file_path, [], False
+            v, tree, instrument, test = self.get_test_data(sh.test, file_path, False)
+            cmd = '?,' * len(v)
+            rows.execute('INSERT OR REPLACE INTO test VALUES (' + cmd[:-1] + ')', v)
+            toi.index_file(rows, sh)
+            rows.execute('INSERT OR REPLACE INTO modify_dates VALUES (?, ?)',
+                         (int(os.path.getmtime(file_path)), test['file']))
+        except:
+            return file_path, [], format_exc()
+        finally:
+            if sh:
+                sh.close(all_handlers=True)
+        return file_path, rows.rows, False
+
     @property
     def dbdir(self):
-        return os.path.dirname(self.dbPath)
+        return os.path.dirname(os.path.normpath(self.dbPath))
+
+    def read_tree(self, conf):
+        """Unpickle the configuration tree stored in `conf` filenode.
+        Versions stored by device leave it empty: returns an empty tree."""
+        node = filenode.open_node(conf, 'r')
+        node.seek(0)
+        tree = node.read()
+        node.close()
+        if not tree:
+            return {}
+        opt = enc_options.copy()
+        if 'encoding' in opt:
+            opt['encoding'] = 'latin1'
+        return pickle.loads(tree, **opt)
 
     def get_test_data(self, table, file_path, add_uid_to_incremental_ids_table):
+        """Returns the test table row of `file_path`, reading the summary stored on conf node
+        if available, otherwise the full configuration tree"""
         conf = getattr(table.root, 'conf', False)
         if '/userdata' in table:
             active_version = str(
@@ -455,16 +663,6 @@ class Indexer(object):
                     if versioned_conf is not False:
                         conf = version_node.conf
 
-        # Load configuration
-        node = filenode.open_node(conf, 'r')
-        node.seek(0)
-        tree = node.read()
-        node.close()
-        opt = enc_options.copy()
-        if 'encoding' in opt:
-            opt['encoding'] = 'latin1'
-        tree = pickle.loads(tree, **opt)
-
         # ##
         # Test row
         # ##
@@ -476,17 +674,25 @@ class Indexer(object):
         instrument = str(conf.attrs.instrument, **enc_options)
 
         test['instrument'] = instrument
-        if instrument not in tree:
-            self.log.debug('Instrument tree missing', instrument)
-            return False
-
-        for p in 'name,comment,nSamples,zerotime,elapsed,id'.split(','):
-            test[p] = tree[instrument]['measure']['self'][p]['current']
+        summary = read_summary(conf)
+        tree = False
+        if summary and summary['instrument'] == instrument:
+            for p in 'name,comment,nSamples,zerotime,elapsed,id'.split(','):
+                test[p] = summary[p]
+        else:
+            tree = self.read_tree(conf)
+            if instrument not in tree:
+                self.log.debug('Instrument tree missing', instrument)
+                return False
+            for p in 'name,comment,nSamples,zerotime,elapsed,id'.split(','):
+                test[p] = tree[instrument]['measure']['self'][p]['current']
         zerotime = test['zerotime']
         test['serial'] = str(conf.attrs.serial, **enc_options)
         uid = getattr(conf.attrs, 'uid', False)
         if not uid or len(uid) < 2:
             self.log.debug('UID attribute not found')
+            if tree is False:
+                tree = self.read_tree(conf)
             sname = tree[instrument]['measure']['id']
             test['uid'] = hashlib.md5(
                 '%s_%s_%i' % (test['serial'], test['zerotime'], sname)).hexdigest()
@@ -657,96 +863,171 @@ class Indexer(object):
         self.conn.commit()
 
     def refresh(self):
-        """Updates the database by inserting new files and removing deleted files"""
+        """Updates the database by inserting new and modified files and removing deleted files.
+        Only files whose size, mtime or inode changed since the last refresh are re-indexed."""
         self.aborted = False
         self.initialized = False
-        self.tasks.jobs(6, 'Refreshing database', abort=self.abort)
-        database = self.execute_fetchall("select file, uid from test")
-        if self.aborted:
-            return False
-        self.tasks.job(1, 'Refreshing database', 'Deleting non-existent files')
-        database = self.delete_not_existing_files(database)
+        t = 'Refreshing database'
+        self.tasks.jobs(4, t, abort=self.abort)
+        known, old_stats, database, modify_dates = self.get_scan_state()
         if self.aborted:
             return False
-        self.tasks.job(2, 'Refreshing database', 'Checking modification dates')
-        all_files = self.tests_filenames_sorted_by_date()
+        self.tasks.job(1, t, 'Scanning files')
+        dirs, stats = scan.scan(self.paths, ext, known)
         if self.aborted:
             return False
-        self.tasks.job(3, 'Refreshing database', 'Forget modified files')
-        database = self.delete_modified_files(database, all_files)
+        self.tasks.job(2, t, 'Deleting non-existent files')
+        removed = [f for f in database if f not in stats and not os.path.exists(f)]
+        for f in removed:
+            self.clear_file_path(database.pop(f))
+        changed = []
+        for f, key in stats.items():
+            if f in database:
+                if f in old_stats:
+                    if old_stats[f] == key:
+                        continue
+                elif modify_dates.get(f) == int(key[1]):
+                    continue
+            changed.append(f)
         if self.aborted:
             return False
-        self.tasks.job(4, 'Refreshing database', 'Re-index modified files')
-        self.add_new_files(all_files, database)
-        self.tasks.job(4, 'Refreshing database', 'Create views')
-        self.analyze_queries()
-        self.refresh_views()
-        
-        self.tasks.done('Refreshing database')
-
-    def delete_modified_files(self, database, all_files):
-        out = []
-        modified_dates_on_db = self.get_modify_dates()
-        
-        def f(db_entry): return (
-            db_entry[0], self.convert_to_full_path(db_entry[1]), db_entry[1])
-        modified_dates_on_db = [f(m) for m in modified_dates_on_db]
-
-        old_modified_dates = {}
-        self.tasks.jobs(len(all_files), 'Reading modification times')
-        for i,f in enumerate(all_files):
-            old_modified_dates[f] = int(os.path.getmtime(f))
-            if self.aborted:
-                return out
-            self.tasks.job(i+1, 'Reading modification times')
-        self.tasks.done('Reading modification times')
-
-        deleted = []
-        t = 'Purging modified files before re-indexing'
-        self.tasks.jobs(len(modified_dates_on_db), t)
-        for i, (modify_date_on_db, full_test_file_name, relative_test_file_name) in enumerate(modified_dates_on_db):
-            if self.aborted:
-                return out
-            old_modified_date = old_modified_dates.get(
-                full_test_file_name, False)
-            if old_modified_date and old_modified_date != modify_date_on_db:
-                # Remove so it will be later re-added
-                self.clear_file_path(relative_test_file_name)
-                deleted.append(relative_test_file_name)
-            self.tasks.job(i+1, t)
-        
-        for relative_file_path, uid in database:
-            if relative_file_path not in deleted:
-                out.append([relative_file_path, uid])
-        self.tasks.done(t)
-        return out
-
-    def delete_not_existing_files(self, database):
-        out = []
-        for i, (relative_file_path, uid) in enumerate(database):
-            if self.aborted:
-                return out
-            absolute_file_path = self.convert_to_full_path(relative_file_path)
-            if not os.path.exists(absolute_file_path):
-                self.clear_file_path(relative_file_path)
+        self.tasks.job(3, t, 'Re-index modified files')
+        ctimes = {}
+        for f in changed:
+            try:
+                ctimes[f] = os.path.getctime(f)
+            except OSError:
+                # Deleted after scanning: removed by the next refresh
+                pass
+        done = set(self.add_changed_files(sorted(ctimes, key=ctimes.get), database))
+        # Files skipped by an abort or deleted keep their old state, so they are handled next time
+        for f in changed:
+            if f in done:
+                continue
+            if f in old_stats:
+                stats[f] = old_stats[f]
             else:
-                out.append([relative_file_path, uid])
-        return out
+                stats.pop(f)
+        if dirs != known or stats != old_stats:
+            self.save_scan_state(dirs, stats)
+        if removed or done:
+            self.tasks.job(4, t, 'Create views')
+            self.analyze_queries()
+            self.refresh_views()
+        self.tasks.done(t)
+        return not self.aborted
 
-    def add_new_files(self, all_files, database):
-        file_names_in_database = [
-            self.convert_to_full_path(d[0]) for d in database]
+    def add_changed_files(self, changed, database):
+        """Index `changed` files, forgetting their previous version if found in `database`.
+        Returns the files actually indexed, which are less than `changed` if aborted."""
         pid = 'Adding files'
-        self.tasks.jobs(len(all_files), pid, abort=self.abort)
-        for i, f in enumerate(all_files):
+        self.tasks.jobs(len(changed), pid, abort=self.abort)
+        done = []
+        for i, f in enumerate(changed):
             if self.aborted:
-                return False
-            msg = ''
-            if f not in file_names_in_database:
-                r = self.appendFile(f)
-                msg = f
-            self.tasks.job(i, pid, msg)
+                break
+            if f in database:
+                self.clear_file_path(database[f])
+            self.appendFile(f)
+            done.append(f)
+            self.tasks.job(i, pid, f)
         self.tasks.done(pid)
+        return done
+
+    @dbcom
+    def get_scan_state(self):
+        """Returns known directories and file stats from last refresh,
+        indexed files by full path and their modify dates"""
+        cur = self.cur
+        full = self.convert_to_full_path
+        known = {}
+        parents = {}
+        cur.execute('select dir, parent, mtime from scan_dirs')
+        for d, parent, mtime in cur.fetchall():
+            d = full(d)
+            known[d] = (mtime, [], [])
+            if parent:
+                parents[d] = full(parent)
+        for d, parent in parents.items():
+            if parent in known:
+                known[parent][1].append(d)
+        stats = {}
+        cur.execute('select file, size, mtime, inode from scan_files')
+        for f, size, mtime, inode in cur.fetchall():
+            f = full(f)
+            stats[f] = (size, mtime, inode)
+            d = known.get(os.path.dirname(f))
+            if d:
+                d[2].append(f)
+        for mtime, subdirs, files in known.values():
+            subdirs.sort()
+            files.sort()
+        cur.execute('select file from test')
+        database = dict((full(r[0]), r[0]) for r in cur.fetchall())
+        cur.execute('select file, modify_date from modify_dates')
+        modify_dates = dict((full(r[0]), r[1]) for r in cur.fetchall())
+        return known, stats, database, modify_dates
+
+    @dbcom
+    def save_file_scan_state(self, file_path, key):
+        """Record the stat `key` of a single `file_path`, or forget it if None"""
+        rel = convert_to_relative_path(file_path, self.dbdir)
+        if key is None:
+            self.cur.execute('delete from scan_files where file=?', (rel,))
+        else:
+            self.cur.execute('insert or replace into scan_files values (?,?,?,?)',
+                             (rel,) + tuple(key))
+        self.conn.commit()
+        return True
+
+    @dbcom
+    def save_scan_state(self, dirs, stats):
+        """Replace the scan state with `dirs` and `stats` returned by scan.scan"""
+        rel = lambda p: convert_to_relative_path(p, self.dbdir)
+        parents = {}
+        for d, (mtime, subdirs, files) in dirs.items():
+            for sub in subdirs:
+                parents[sub] = rel(d)
+        self.cur.execute('delete from scan_dirs')
+        self.cur.execute('delete from scan_files')
+        self.cur.executemany('insert or replace into scan_dirs values (?,?,?)',
+                             [(rel(d), parents.get(d, ''), v[0]) for d, v in dirs.items()])
+        self.cur.executemany('insert or replace into scan_files values (?,?,?,?)',
+                             [(rel(f),) + tuple(v) for f, v in stats.items()])
+        self.conn.commit()
+        return True
+
+    def update_file(self, file_path):
+        """Forget `file_path` and index it again if it still exists.
+        Its scan state is updated, so refresh will not index it again."""
+        file_path = os.path.normpath(file_path)
+        self.clear_file_path(convert_to_relative_path(file_path, self.dbdir))
+        try:
+            key = scan.stat_key(os.stat(file_path))
+        except OSError:
+            self.save_file_scan_state(file_path, None)
+            return False
+        r = self.appendFile(file_path)
+        self.save_file_scan_state(file_path, key)
+        return r
+
+    def start_watch(self, backend=None, debounce=10.):
+        """Keep the database current by indexing files as they are
+        created, modified or deleted under paths.
+        `backend` defaults to inotify if available, otherwise polling.
+        Files are indexed once unchanged for `debounce` seconds."""
+        self.stop_watch()
+        if backend is None:
+            backend = default_backend(self.paths, ext)
+        self.watcher = Watcher(self.update_file, backend, debounce)
+        return self.watcher.start()
+
+    def stop_watch(self):
+        """Stop watching paths"""
+        if not self.watcher:
+            return False
+        self.watcher.stop()
+        self.watcher = False
         return True
 
     def remove_uid(self, uid):
@@ -766,8 +1047,7 @@ class Indexer(object):
         if not uids:
             self.log.debug('No db entry found for:', relative_file_path)
             return False
-        for uid in uids:
-            toi.clear_test_uid(self.cur, uid[0])
+        toi.clear_test_uids(self.cur, [uid[0] for uid in uids])
         r = self.cur.fetchall()
         e = self.cur.execute(
             'delete from test where file=?', (relative_file_path,))
@@ -884,14 +1164,16 @@ class Indexer(object):
         
 
     def convert_to_full_path(self, file_path):
+        """Absolute, normalized path of a database `file_path`,
+        comparable with paths returned by scan.scan"""
         if file_path.startswith("."):
             if file_path.startswith('.\\'):
                 file_path = '/'.join(file_path.split('\\'))
             relative_path = [self.dbdir] + file_path[1:].split('/')
             relative_path = os.path.join(*relative_path)
-            return relative_path
+            return os.path.normpath(relative_path)
 
-        return file_path
+        return os.path.normpath(file_path)
 
     def convert_query_result_to_full_path(self, query_results):
         converted = []
@@ -15,6 +15,7 @@ except:
 from traceback import format_exc
 import tables
 from datetime import datetime
+from uuid import uuid4
 import numpy as np
 from ..parameters import cfilter
 from .. import csutil
@@ -22,18 +23,72 @@ from .. import option
 from ..csutil import lockme, enc_options, str3
 from .. import reference
 
-from .corefile import CoreFile
+from .corefile import CoreFile, shared_attr
 from .dataops import DataOperator
+from .readerpool import ReaderPool
 from . import digisign
+from . import conftree
 from .digisign import list_references
 
 max_string_length = 1000
 
+summary_keys = ('instrument', 'name', 'comment', 'nSamples', 'zerotime', 'elapsed', 'id')
+"""Test summary options stored as summary_* attributes of the conf node"""
+summary_defaults = {'name': '', 'comment': '', 'nSamples': 0,
+                    'zerotime': 0., 'elapsed': 0., 'id': ''}
+"""Summary values of options missing from the measure"""
+
+
+def test_summary(tree, instrument):
+    """Extract test summary values of `instrument` from a configuration `tree`"""
+    measure = tree.get(instrument, {}).get('measure', {}).get('self', {})
+    r = {'instrument': instrument}
+    for key in summary_keys[1:]:
+        r[key] = measure.get(key, {}).get('current', summary_defaults[key])
+    return r
+
+
+def read_summary(conf):
+    """Returns the test summary dict stored on `conf` node, or False if missing"""
+    attrs = conf._v_attrs
+    if 'summary_instrument' not in attrs._v_attrnamesuser:
+        return False
+    return dict((key, getattr(attrs, 'summary_' + key)) for key in summary_keys)
+
 # To disable @lockme locking:
 # lockme=lambda func: func
 tables.file._FILE_OPEN_POLICY = 'default'
 
 
+header_blob_prefix = 'header_blob_'
+"""Userdata header cache nodes: rows of newline-joined paths"""
+removed_marker = '-'
+"""First line of header cache rows listing removed paths"""
+
+
+def encode_paths(paths, removed=False):
+    """Encode a list of paths as a newline-joined uint8 array.
+    If `removed`, the row marks the paths as removed."""
+    if removed:
+        paths = [removed_marker] + list(paths)
+    return np.array(bytearray('\n'.join(paths).encode('utf8')), dtype=np.uint8)
+
+
+def decode_paths(rows):
+    """Decode paths from rows of encode_paths, in order of addition and removal"""
+    r = []
+    for row in rows:
+        if not len(row):
+            continue
+        paths = str3(row.tobytes()).split(str3(b'\n'))
+        if paths[0] == removed_marker:
+            gone = set(paths[1:])
+            r = [p for p in r if p not in gone]
+        else:
+            r += paths
+    return r
+
+
 def pathnode(path):
     """Split a complete path into its group and leaf components"""
     while path.endswith('/'):
@@ -54,15 +109,24 @@ class SharedFile(CoreFile, DataOperator):
     """Current file version"""
     conf = False
     """Configuration dictionary"""
+    conf_format = 'pickle'
+    """Configuration tree storage: 'pickle' writes a full pickled tree per version.
+    'columnar' stores versions only by device, as a delta from their parent version,
+    leaving an empty /ver_N/conf node with the attributes."""
 
     def __init__(self, *a, **k):
         self.conf = False
+        self.reader_pool = False
+        """Per-thread read-only handles"""
         CoreFile.__init__(self, *a, **k)
-        self.node_cache = {}
 
     def open_file(self, path=False, uid='', mode='a', title='', header=True, version='', load_conf=True):
         """opens the hdf file in `path` or `uid`"""
-        self.node_cache = {}
+        self.node_cache.clear()
+        # Header listing is reloaded from the file cache
+        self._header = {}
+        self._invalidate_versioned()
+        self.time_index.invalidate()
         if not path:
             path = self.path
         if not path:
@@ -70,6 +134,8 @@ class SharedFile(CoreFile, DataOperator):
             return False
         # Always open the real, normalize path
         path = os.path.realpath(os.path.normpath(path))
+        # Frames might have changed on disk
+        self.frame_cache.invalidate(path)
 
         if mode == 'w':
             self.log.debug('Creating in write mode', path)
@@ -109,6 +175,39 @@ class SharedFile(CoreFile, DataOperator):
             self.conf = option.ConfigurationProxy()
         return self.test, self.path
 
+    def close(self, *a, **k):
+        self.close_readers()
+        return CoreFile.close(self, *a, **k)
+
+    @staticmethod
+    def open_reader(path, version):
+        """Open a new read-only handle on `path` at `version`"""
+        return SharedFile(path, mode='r', version=version)
+
+    def reader(self):
+        """Returns a read-only handle on this file for the calling thread.
+        Threads reading through their own handle do not queue behind each other.
+        PyTables cannot open a file again while it is open for writing:
+        writable files (e.g. during an acquisition) return this same handle,
+        so their readers keep queueing behind its lock."""
+        if not self.test or self.writable():
+            return self
+        pool = self.reader_pool
+        version = self.get_version()
+        if not pool or pool.path != self.path or pool.version != version:
+            self.close_readers()
+            pool = ReaderPool(self.path, version, self.open_reader)
+            self.reader_pool = pool
+        return pool.get()
+
+    def close_readers(self):
+        """Close all per-thread read-only handles"""
+        if not self.reader_pool:
+            return False
+        self.reader_pool.close()
+        self.reader_pool = False
+        return True
+
     def writable(self):
         if not self.test:
             return False
@@ -218,15 +317,19 @@ class SharedFile(CoreFile, DataOperator):
             type(new_version),
             self.version))
         self.version = str(new_version)
+        self.node_cache.invalidate()
         if self.writable():
             self._set_attributes(
                 '/userdata', attrs={'active_version': new_version})
             return True
         return False
 
-    def create_version(self, name=False, overwrite=True):
-        """Create a new version with `name`. `overwrite` a previous version with same name."""
+    def create_version(self, name=False, overwrite=True, parent=None):
+        """Create a new version with `name`. `overwrite` a previous version with same name.
+        A new version initially shares all nodes of its `parent` version (default: current)."""
         self.reopen(mode='a')
+        if parent is None:
+            parent = self.get_version()
         newversion = False
         if name:
             newversion = self.get_version_by_name(name)
@@ -245,10 +348,13 @@ class SharedFile(CoreFile, DataOperator):
         if not self.has_node('/', newversion[1:]):
             self.log.debug('creating new version', newversion, name)
             self.test.create_group('/', newversion[1:])
+            self._invalidate_versioned(newversion)
+            if parent != newversion and (not parent or self.has_node(parent)):
+                self.link_version(parent, newversion)
         else:
             self.log.debug('using existing version', newversion, name)
         d = datetime.now().strftime("%H:%M:%S, %d/%m/%Y")
-        self._set_attributes(newversion, attrs={'name': name, 'date': d})
+        self._set_attributes(newversion, attrs={'name': name, 'date': d, 'parent': parent})
         self.test.root.conf.attrs.versions = latest
         # Set current version (will be empty until some transparent writing
         # occurs)
@@ -258,6 +364,58 @@ class SharedFile(CoreFile, DataOperator):
         self.test.flush()
         return newversion
 
+    def _version_nodes(self, parent):
+        """All nodes of `parent` version. The original version ('') excludes
+        other versions, /userdata and its configuration, which versions save on their own."""
+        if parent:
+            return self._get_node(parent)._f_walknodes()
+        nodes = []
+        for child in self.test.root._f_iter_nodes():
+            name = child._v_name
+            if name.startswith('ver_') or name in ('userdata', 'conf', conftree.group_name):
+                continue
+            nodes.append(child)
+            if isinstance(child, tables.Group):
+                nodes.extend(child._f_walknodes())
+        return nodes
+
+    @lockme()
+    def link_version(self, parent, version):
+        """Populate `version` with hard links to all nodes of `parent` version, recreating groups.
+        Nodes are copied on write: save_data and filenode_write replace them, while
+        attribute setters and appends first make a private copy of leaves marked as shared
+        (CoreFile._own_node). Returns the number of linked nodes."""
+        classes = {}
+        for cls_name, paths in self._header.items():
+            for path in paths:
+                classes[path] = cls_name
+        linked = {}
+        n = 0
+        for node in self._version_nodes(parent):
+            path = version + node._v_pathname[len(parent):]
+            if self._has_node(path):
+                continue
+            where, name = [str(p) for p in pathnode(path)]
+            if isinstance(node, tables.Group):
+                group = self.test.create_group(where, name)
+                node._v_attrs._f_copy(group)
+            elif isinstance(node, tables.link.SoftLink):
+                self.test.create_soft_link(where, name, node.target)
+            else:
+                setattr(node._v_attrs, shared_attr, True)
+                self.test.create_hard_link(where, name, node)
+                n += 1
+            cls_name = classes.get(node._v_pathname, False)
+            if cls_name:
+                self._header[cls_name].append(path)
+                linked.setdefault(cls_name, []).append(path)
+        for cls_name, paths in linked.items():
+            self._append_userdata_header(cls_name, paths)
+        self.node_cache.invalidate(version)
+        self._invalidate_versioned(version)
+        self.log.debug('Linked version', parent, version, n)
+        return n
+
     def remove_version(self, version_path, remove_plots=True):
         self.reopen(mode='a')
         if remove_plots:
@@ -364,12 +522,19 @@ class SharedFile(CoreFile, DataOperator):
                 txt += '\n'
         return txt
 
-    def conf_tree(self, path=False):
+    def conf_tree(self, path=False, version=None):
+        """Load the configuration tree stored in `path`, or of `version` (default: current),
+        rebuilding it from columnar storage if available"""
         if not path:
-            path = self.versioned('/conf')
+            if version is None:
+                version = self.get_version()
+            devices = self.read_conf_devices(version)
+            if devices:
+                return conftree.unflatten(devices)
+            path = self.versioned('/conf', version=version)
         self.log.debug('Loading conf', path)
         tree = self.file_node(path)
-        if tree in [False, None]:
+        if not tree:
             self.log.warning('Configuration node file not found!', path)
             return '{}'
         # test
@@ -384,10 +549,137 @@ class SharedFile(CoreFile, DataOperator):
         self.log.debug('Conf tree length:', len(tree))
         return d
 
+    def _conf_devices_chain(self, version):
+        """Columnar groups describing `version`, from its own down to a complete one.
+        False if missing, or if a base was rewritten after a delta was computed from it."""
+        chain = []
+        while True:
+            path = version + '/' + conftree.group_name
+            if not self._has_node(path):
+                return False
+            group = self._get_node(path)
+            chain.append(group)
+            attrs = group._v_attrs
+            if 'base' not in attrs._v_attrnamesuser:
+                return chain
+            version = attrs.base
+            base = version + '/' + conftree.group_name
+            if not self._has_node(base) or \
+                    getattr(self._get_node(base)._v_attrs, 'stamp', None) != attrs.base_stamp:
+                return False
+
+    def _read_conf_devices(self, version=''):
+        chain = self._conf_devices_chain(version)
+        if not chain:
+            return False
+        devices = conftree.read(chain[-1])
+        for group in reversed(chain[:-1]):
+            devices = conftree.apply_delta(devices, conftree.read(group))
+        return devices
+
+    @lockme()
+    def read_conf_devices(self, version=''):
+        """Devices stored in columnar format for `version`, or False if missing or stale"""
+        return self._read_conf_devices(version)
+
+    @lockme()
+    def read_conf_device(self, version, device):
+        """Description of `device` stored in columnar format for `version`.
+        False if not found, None if columnar storage is missing or stale."""
+        chain = self._conf_devices_chain(version)
+        if not chain:
+            return None
+        for group in chain:
+            desc = conftree.read_device(group, device)
+            if desc is conftree.removed:
+                return False
+            if desc is not False:
+                return desc
+        return False
+
+    def conf_devices(self, version=None):
+        """Flattened configuration tree of `version`, {device path: description}"""
+        if version is None:
+            version = self.get_version()
+        devices = self.read_conf_devices(version)
+        if devices is False:
+            devices = conftree.flatten(self.conf_tree(version=version))
+        return devices
+
+    def conf_device(self, device, version=None):
+        """Description of a single `device` path (eg: /hsm/sample0/) in `version`,
+        reading only its own rows if stored in columnar format. False if not found."""
+        if version is None:
+            version = self.get_version()
+        desc = self.read_conf_device(version, device)
+        if desc is None:
+            return self.conf_devices(version).get(device, False)
+        return desc
+
+    def _conf_devices_dependents(self, version, stamp):
+        """Versions whose columnar delta is based on `version` with `stamp`"""
+        out = []
+        for node in self.test.list_nodes('/'):
+            name = str(node._v_name)
+            path = '/' + name + '/' + conftree.group_name
+            if not name.startswith('ver_') or not self._has_node(path):
+                continue
+            attrs = self._get_node(path)._v_attrs
+            if getattr(attrs, 'base', None) == version and \
+                    getattr(attrs, 'base_stamp', None) == stamp:
+                out.append('/' + name)
+        out.sort(key=lambda v: int(v.split('_')[-1]))
+        return out
+
+    def _write_conf_devices(self, version, devices, stamp=None):
+        """Write flattened `devices` of `version`, as a delta if its parent has columnar storage.
+        Returns the stamp of the written group (a new one if `stamp` is None)."""
+        attrs = {'stamp': stamp or uuid4().hex}
+        if version and self._has_node(version):
+            base = getattr(self._get_node(version)._v_attrs, 'parent', '')
+            if base != version:
+                chain = self._conf_devices_chain(base)
+                if chain:
+                    devices = conftree.delta(self._read_conf_devices(base), devices)
+                    attrs['base'] = base
+                    attrs['base_stamp'] = chain[0]._v_attrs.stamp
+        group = conftree.write(self.test, version or '/', devices, cfilter)
+        for key, val in attrs.items():
+            setattr(group._v_attrs, key, val)
+        path = version + '/' + conftree.group_name
+        self.node_cache.invalidate(path)
+        self._invalidate_versioned(path)
+        return attrs['stamp']
+
+    @lockme()
+    def save_conf_devices(self, version, tree):
+        """Store `tree` by device. If the parent of `version` has valid columnar storage,
+        only devices changed from it are stored, with the parent path and stamp.
+        Deltas of other versions based on `version` are recomputed, keeping their stamps."""
+        path = version + '/' + conftree.group_name
+        stamp = None
+        if self._has_node(path):
+            stamp = getattr(self._get_node(path)._v_attrs, 'stamp', None)
+        dependents = []
+        if stamp:
+            for ver in self._conf_devices_dependents(version, stamp):
+                devices = self._read_conf_devices(ver)
+                if devices:
+                    dependents.append((ver, devices,
+                                       self._get_node(ver + '/' + conftree.group_name)._v_attrs.stamp))
+        self._write_conf_devices(version, conftree.flatten(tree))
+        for ver, devices, stamp in dependents:
+            self._write_conf_devices(ver, devices, stamp)
+        self.test.flush()
+        return True
+
     def xmlrpc_conf_tree(self):
         t = self.file_node(self.versioned('/conf'))
         if t is False:
             return t
+        if not t:
+            # Stored by device
+            t = dumps(self.conf_tree())
         return csutil.binfunc(t)
 
     def save_conf(self, tree=False, writeLevel=3):
@@ -397,13 +689,44 @@ class SharedFile(CoreFile, DataOperator):
                 self.load_conf()
             tree = self.conf.tree()
         ver = self.get_version()
-        self.filenode_write(ver + '/conf', obj=tree)
+        conf = ver + '/conf'
+        columnar = self.conf_format == 'columnar' and ver != ''
+        if columnar:
+            # Deltas are computed from the parent, which must be stored by device too
+            parent = getattr(self.get_node(ver)._v_attrs, 'parent', '')
+            if parent != ver and self.has_node(parent or '/conf') and \
+                    not self.read_conf_devices(parent):
+                self.save_conf_devices(parent, self.conf_tree(version=parent))
+            # Only holds the attributes: the tree is stored by device
+            self.filenode_write(conf, data='')
+        else:
+            self.filenode_write(conf, obj=tree)
         if ver != '':
             a = self.get_attributes('/conf')
-            self.set_attributes(ver + '/conf', attrs=a)
+            # The summary of the original tree does not apply to this version
+            a = dict((k, v) for k, v in a.items() if not k.startswith('summary_'))
+            self.set_attributes(conf, attrs=a)
+        self.save_summary(conf, tree)
+        # Columnar storage must follow any rewrite of the pickled tree
+        if self.conf_format == 'columnar' or self.has_node(ver + '/' + conftree.group_name):
+            self.save_conf_devices(ver, tree)
         self.conf = option.ConfigurationProxy(desc=tree)
         return
 
+    def save_summary(self, path, tree):
+        """Store the test summary of `tree` as attributes of conf node `path`,
+        so it can be read without loading the whole tree.
+        If `tree` has no summary, any previous one is removed."""
+        instrument = self.get_attributes('/conf').get('instrument', False)
+        if instrument:
+            instrument = str3(instrument)
+        if not instrument or instrument not in tree:
+            self.del_attributes(path, ['summary_' + k for k in summary_keys])
+            return False
+        summary = test_summary(tree, instrument)
+        self.set_attributes(path, attrs=dict(('summary_' + k, v) for k, v in summary.items()))
+        return True
+
     def save_data(self, path, data, time_data, opt=False):
         version = self.active_version()
         if version is '':
@@ -441,6 +764,7 @@ class SharedFile(CoreFile, DataOperator):
         self.flush()
         if path not in self._header[array_cls.__name__]:
             self._header[array_cls.__name__].append(path)
+            self._append_userdata_header(array_cls.__name__, [path])
 
     def active_version(self):
         try:
@@ -455,33 +779,93 @@ class SharedFile(CoreFile, DataOperator):
             return ''
         
     def _write_userdata_header(self, h):
-        """Save header dict into userdata cache.
+        """Save header dict into userdata cache, one newline-joined blob per reference class.
         No lock."""
         from time import time
         t0 = time()
         if not self._has_node('/userdata'):
-            self.create_group('/', 'userdata')
-            self.set_attributes('/userdata', attrs={'active_version': ''})
-        # Write each header entry in a separate variable-length-array
+            self.test.create_group('/', 'userdata')
+            self.test.set_node_attr('/userdata', 'active_version', '')
+        attrs = self.test.get_node('/userdata')._v_attrs
+        # Remove old per-character cache and blobs of disappeared classes
+        old = list(getattr(attrs, 'header', [])) + list(getattr(attrs, 'header_classes', []))
+        for cls_name in old:
+            for name in ('header_' + cls_name, header_blob_prefix + cls_name):
+                if self._has_node('/userdata', name):
+                    self.test.remove_node('/userdata', name)
+        if 'header' in attrs._v_attrnamesuser:
+            del attrs.header
         for cls_name in h:
-            name = 'header_'+cls_name
-            if self._has_node('/userdata', name):
-                self.test.remove_node('/userdata',name)
-            vla = self.test.create_vlarray(where='/userdata',
-                                    name=name,
-                                    atom=tables.StringAtom(itemsize=1),
-                                    title='Header cache for '+cls_name,
-                                    filters=cfilter)
-            for dsn in h[cls_name]:
-                vla.append(list(dsn))
+            self._create_header_blob(cls_name, h[cls_name])
             self.log.debug('Wrote cached header class', cls_name, len(h[cls_name]))
-        # put only the keys in the header attr
-        self.test.set_node_attr('/userdata', 'header', list(h.keys()))
+        # put only the keys in the header_classes attr
+        self.test.set_node_attr('/userdata', 'header_classes', list(h.keys()))
         self.log.debug('Finished writing headers cache', len(h), 1000 * (time() - t0))
-                
+
+    def _create_header_blob(self, cls_name, paths):
+        vla = self.test.create_vlarray(where='/userdata',
+                                       name=header_blob_prefix + cls_name,
+                                       atom=tables.UInt8Atom(),
+                                       title='Header cache for ' + cls_name,
+                                       filters=cfilter)
+        if paths:
+            vla.append(encode_paths(paths))
+        return vla
+
+    def _append_userdata_header(self, cls_name, paths, removed=False):
+        """Append `paths` of `cls_name` to the userdata header cache, if present.
+        If `removed`, append a row marking them as removed.
+        No lock."""
+        if not self.writable() or not self._has_node('/userdata'):
+            return False
+        classes = getattr(self.test.get_node('/userdata')._v_attrs, 'header_classes', None)
+        if classes is None:
+            return False
+        name = header_blob_prefix + cls_name
+        if cls_name not in classes:
+            if removed:
+                return False
+            self._create_header_blob(cls_name, paths)
+            self.test.set_node_attr('/userdata', 'header_classes', list(classes) + [cls_name])
+            return True
+        self.test.get_node('/userdata/' + name).append(encode_paths(paths, removed))
+        return True
+
+    def _remove_userdata_header(self, cls_name, paths):
+        """Mark `paths` of `cls_name` as removed in the userdata header cache.
+        Removal rows are compacted when the cache is rewritten by header(refresh=True).
+        No lock."""
+        return self._append_userdata_header(cls_name, paths, removed=True)
+
     def _read_userdata_header(self):
         """Load header dict from userdata cache.
         No lock"""
+        if not self._has_node('/userdata'):
+            self.log.debug('_read_userdata_header: no /userdata')
+            return {}
+        attrs = self.test.get_node('/userdata')._v_attrs
+        classes = getattr(attrs, 'header_classes', None)
+        if classes is None:
+            if 'header' not in attrs._v_attrnamesuser:
+                return {}
+            h = self._read_userdata_header_chars()
+            if h and self.writable():
+                # Migrate older caches, so that new nodes get recorded
+                self._write_userdata_header(h)
+            return h
+        h = {}
+        for cls_name in classes:
+            name = header_blob_prefix + cls_name
+            if not self._has_node('/userdata', name):
+                self.log.error('Could not find header class', cls_name)
+                continue
+            h[cls_name] = decode_paths(self.test.get_node('/userdata/' + name).read())
+        self.log.debug('Loaded cached header', len(h))
+        return h
+
+    def _read_userdata_header_chars(self):
+        """Load header dict from the per-character userdata cache of older files.
+        No lock"""
         from time import time
         t0 = time()
         h = {}
@@ -543,18 +927,14 @@ class SharedFile(CoreFile, DataOperator):
             r += self._header.get(k, [])
         if startswith:
             swv = version + startswith
-            r = filter(lambda el: el.startswith(
-                startswith) or el.startswith(swv), r)
+            r = [el for el in r if el.startswith(startswith) or el.startswith(swv)]
         if not version:
-            r = filter(lambda el: not el.startswith('/ver_'), r)
-        else:
-            # Exclude element with wrong version
-            def good(el): return el.startswith(
-                version + '/') or not el.startswith('/ver_')
-            r = filter(good, r)
-            # Exclude unversioned elements having a version
-            r = filter(lambda el: version + el not in r, r)
-        return list(r)
+            return [el for el in r if not el.startswith('/ver_')]
+        prefix = version + '/'
+        present = set(r)
+        # Keep elements of this version and unversioned elements not overridden by it
+        return [el for el in r if el.startswith(prefix) or
+                (not el.startswith('/ver_') and version + el not in present)]
 
     def xmlrpc_col(self, *a, **k):
         r = self.col(*a, **k)
@@ -573,11 +953,13 @@ class SharedFile(CoreFile, DataOperator):
         return r
 
     @lockme()
-    def query_time(self, path, startTime=-1,  endTime=-1, step=None, interp=False):
-        """Reads an array in the requested time range"""
+    def query_time(self, path, startTime=-1,  endTime=-1, step=None, interp=False, max_points=None):
+        """Reads an array in the requested time range.
+        If `max_points` is set, rows are read from the decimation pyramid level
+        returning at most max_points (t, v, min, max) rows."""
         n = self._get_node(path)
         # TODO: adapt also to other Reference objects
-        t = n.cols.t
+        t = self.time_index.column(n, path)
         if startTime < 0:
             startTime = t[0]
         if endTime <= 0:
@@ -586,10 +968,12 @@ class SharedFile(CoreFile, DataOperator):
             self.log.error('impossible time frame', startTime, endTime)
 #			n.close()
             return []
-        si = csutil.find_nearest_val(t, startTime)
-        ei = csutil.find_nearest_val(t, endTime)
+        si, ei = self._get_times(path, [startTime, endTime])
         self.log.debug(startTime, si, endTime, ei)
-        arr = n[si:ei]
+        if max_points:
+            arr = self._query_lod(path, si, ei, max_points)
+        else:
+            arr = n[si:ei]
 #		n.close()
         if step is None:
             return arr
@@ -607,6 +991,10 @@ class SharedFile(CoreFile, DataOperator):
             r = arr
         return r
 
+    def xmlrpc_get_frame(self, *a, **k):
+        r = self.get_frame(*a, **k)
+        return csutil.binfunc(dumps(r))
+
     def xmlrpc_query_time(self, *a, **k):
         r = self.query_time(*a, **k)
         return csutil.binfunc(dumps(r))
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""Vectorized search kernels for DataOperator.
+Each kernel receives a value array `y` and an optional reference value `val`,
+and returns the index of the first matching element, or None."""
+import numpy as np
+
+
+def first_true(mask):
+    """Index of the first True element of boolean array `mask`, or None"""
+    if not len(mask):
+        return None
+    i = int(np.argmax(mask))
+    if not mask[i]:
+        return None
+    return i
+
+
+def argmax(y, val=None):
+    """First maximum of `y`"""
+    if not len(y):
+        return None
+    return int(np.argmax(y))
+
+
+def argmin(y, val=None):
+    """First minimum of `y`"""
+    if not len(y):
+        return None
+    return int(np.argmin(y))
+
+
+def nearest(y, val):
+    """First element of `y` nearest to `val`"""
+    if not len(y):
+        return None
+    return int(np.argmin(np.abs(np.asarray(y, dtype=np.float64) - val)))
+
+
+def equals(y, val):
+    """First element of `y` equal to `val`"""
+    return first_true(y == val)
+
+
+def drops(y, val):
+    """First element of `y` below `val`"""
+    return first_true(y < val)
+
+
+def rises(y, val):
+    """First element of `y` above `val`"""
+    return first_true(y > val)
+
+
+conditions = {'x==y': equals, 'x~y': nearest, 'x<y': drops, 'x>y': rises}
+"""Kernels by DataOperator.search condition"""
+
+
+class Reduction(object):
+
+    """Blockwise reduction, accumulating partial results over consecutive blocks of a dataset"""
+    done = False
+    """True when further blocks cannot change the result"""
+
+    def update(self, y, offset):
+        """Accumulate block `y` starting at dataset index `offset`"""
+        raise NotImplementedError()
+
+    def result(self):
+        """Reduced value, or None if no element was accumulated"""
+        raise NotImplementedError()
+
+
+class Extreme(Reduction):
+
+    """First best element according to `kernel` (argmax, argmin, nearest)"""
+
+    def __init__(self, kernel, val=None):
+        self.kernel = kernel
+        self.val = val
+        self.index = None
+        self.value = None
+
+    def update(self, y, offset):
+        i = self.kernel(y, self.val)
+        if i is None:
+            return
+        # A later block wins only if strictly better
+        if self.index is None or self.kernel(np.array([self.value, y[i]]), self.val) == 1:
+            self.index = offset + i
+            self.value = y[i]
+
+    def result(self):
+        if self.index is None:
+            return None
+        return self.index, self.value
+
+
+class Crossing(Extreme):
+
+    """First element matching `kernel` (drops, rises, equals)"""
+
+    def update(self, y, offset):
+        i = self.kernel(y, self.val)
+        if i is None:
+            return
+        self.index = offset + i
+        self.value = y[i]
+        self.done = True
+
+
+class Moments(Reduction):
+
+    """Count, mean and standard deviation, merged block by block"""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.
+        self.m2 = 0.
+
+    def update(self, y, offset):
+        nb = len(y)
+        if not nb:
+            return
+        mb = y.mean()
+        m2b = ((y - mb)**2).sum()
+        n = self.n + nb
+        delta = mb - self.mean
+        self.mean += delta * nb / n
+        self.m2 += m2b + delta**2 * self.n * nb / n
+        self.n = n
+
+    def result(self):
+        if not self.n:
+            return None
+        return self.n, self.mean, np.sqrt(self.m2 / self.n)
+
+
+extremes = {'max': argmax, 'argmax': argmax, 'min': argmin, 'argmin': argmin,
+            'nearest': nearest}
+crossings = {'equals': equals, 'drops': drops, 'rises': rises}
+
+
+def search_reduction(kernel, val=None):
+    """Build the blockwise Reduction searching with `kernel`"""
+    if kernel in crossings.values():
+        return Crossing(kernel, val)
+    return Extreme(kernel, val)
+
+
+def reduction(name, val=None):
+    """Build the blockwise Reduction called `name`"""
+    if name in extremes:
+        return Extreme(extremes[name], val)
+    if name in crossings:
+        return Crossing(crossings[name], val)
+    if name in ('mean', 'std'):
+        return Moments()
+    raise ValueError('Unknown reduction: ' + name)
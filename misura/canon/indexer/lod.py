@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Multi-resolution decimation pyramid (levels of detail) of Array nodes.
+Each level stores time, mean, min and max of buckets of `factor` rows of the level below."""
+import numpy as np
+
+factor = 10
+"""Decimation factor between consecutive levels"""
+levels = 3
+"""Number of levels: 10x, 100x, 1000x"""
+lod_root = '/userdata/lod'
+"""Root group of all pyramids"""
+fields = [('t', 'float64'), ('v', 'float64'),
+          ('min', 'float64'), ('max', 'float64')]
+
+
+def lod_path(path, level):
+    """Location of pyramid `level` (starting from 1) of Array node `path`"""
+    return '{}/l{}{}'.format(lod_root, factor**level, path)
+
+
+def lod_paths(path):
+    """Locations of all pyramid levels of Array node `path`"""
+    return [lod_path(path, level) for level in range(1, levels + 1)]
+
+
+def decimate(rows):
+    """Reduce structured `rows` into buckets of `factor` consecutive rows.
+    `rows` length must be a multiple of factor.
+    Min and max fields are used if present, otherwise values are taken."""
+    n = len(rows) // factor
+    names = rows.dtype.names
+    v = rows['v'].astype(np.float64).reshape(n, factor)
+    vmin = rows['min'].reshape(n, factor) if 'min' in names else v
+    vmax = rows['max'].reshape(n, factor) if 'max' in names else v
+    out = np.empty(n, dtype=fields)
+    out['t'] = rows['t'].reshape(n, factor).mean(axis=1)
+    out['v'] = v.mean(axis=1)
+    out['min'] = vmin.min(axis=1)
+    out['max'] = vmax.max(axis=1)
+    return out
+
+
+def expand(rows):
+    """Raw (t, v) `rows` in pyramid format, with min and max equal to v"""
+    out = np.empty(len(rows), dtype=fields)
+    out['t'] = rows['t']
+    out['v'] = rows['v']
+    out['min'] = rows['v']
+    out['max'] = rows['v']
+    return out
+
+
+def reduce(rows, size):
+    """Reduce pyramid-format `rows` into buckets of `size` consecutive rows.
+    The last bucket can be incomplete."""
+    if size <= 1 or not len(rows):
+        return rows
+    return reduce_at(rows, np.arange(0, len(rows), size))
+
+
+def reduce_at(rows, idx):
+    """Reduce pyramid-format `rows` into buckets starting at each of the increasing indexes `idx`"""
+    count = np.diff(np.append(idx, len(rows)))
+    out = np.empty(len(idx), dtype=fields)
+    out['t'] = np.add.reduceat(rows['t'], idx) / count
+    out['v'] = np.add.reduceat(rows['v'], idx) / count
+    out['min'] = np.minimum.reduceat(rows['min'], idx)
+    out['max'] = np.maximum.reduceat(rows['max'], idx)
+    return out
+
+
+def resample(rows, npoints):
+    """Reduce pyramid-format `rows` into exactly `npoints` buckets of nearly equal size,
+    if they are more than `npoints`"""
+    n = len(rows)
+    if n <= npoints:
+        return rows
+    return reduce_at(rows, np.arange(npoints) * n // npoints)
+
+
+def pick_level(npoints, max_points):
+    """Highest level still representing `npoints` raw points with at least `max_points`.
+    Returns 0 if raw data is not more than `max_points`, `levels` at most."""
+    level = 0
+    while level < levels and npoints >= max_points * factor**(level + 1):
+        level += 1
+    return level
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Bounded cache of open HDF nodes"""
+from collections import OrderedDict
+
+
+class NodeCache(object):
+
+    """Least recently used cache of open nodes by path, with hit/miss counters"""
+
+    def __init__(self, size=2048):
+        self.size = size
+        """Maximum number of cached nodes"""
+        self.nodes = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, path):
+        return path in self.nodes
+
+    def get(self, path):
+        """Returns the open node cached for `path`, or None"""
+        n = self.nodes.pop(path, None)
+        if n is None or not n._v_isopen:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Mark as most recently used
+        self.nodes[path] = n
+        return n
+
+    def put(self, path, node):
+        """Cache `node` for `path`, evicting the least recently used nodes beyond size"""
+        self.nodes.pop(path, None)
+        self.nodes[path] = node
+        while len(self.nodes) > self.size:
+            self.nodes.popitem(last=False)
+        return node
+
+    def invalidate(self, path=False):
+        """Forget `path` and its children, or all nodes if False"""
+        if path is False:
+            self.nodes = OrderedDict()
+            return True
+        path = path.rstrip('/')
+        for key in list(self.nodes.keys()):
+            if key == path or key.startswith(path + '/'):
+                self.nodes.pop(key)
+        return True
+
+    def clear(self):
+        """Forget all nodes and reset counters"""
+        self.invalidate()
+        self.hits = 0
+        self.misses = 0
+        return True
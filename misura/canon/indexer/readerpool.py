@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Pool of read-only file handles, one per thread"""
+import threading
+
+
+class ReaderPool(object):
+
+    """Read-only handles on the same file and version, one per calling thread.
+    Each handle has its own lock, so readers in different threads do not queue
+    behind each other. `open_reader(path, version)` creates a new handle.
+    Handles of exited threads are closed when a new handle is opened, or by prune."""
+
+    def __init__(self, path, version, open_reader):
+        self.path = path
+        self.version = version
+        self.open_reader = open_reader
+        self.local = threading.local()
+        self.readers = {}  # thread ident: handle
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Returns the read-only handle of the calling thread"""
+        reader = getattr(self.local, 'reader', None)
+        if reader is None or not reader.isopen():
+            reader = self.open_reader(self.path, self.version)
+            self.local.reader = reader
+            with self._lock:
+                self._prune()
+                old = self.readers.pop(threading.current_thread().ident, None)
+                if old is not None:
+                    old.close()
+                self.readers[threading.current_thread().ident] = reader
+        return reader
+
+    def _prune(self):
+        """Close handles left open by threads which already exited"""
+        alive = set(th.ident for th in threading.enumerate())
+        for key in list(self.readers.keys()):
+            if key not in alive:
+                self.readers.pop(key).close()
+
+    def prune(self):
+        """Close handles left open by threads which already exited"""
+        with self._lock:
+            self._prune()
+        return True
+
+    def close(self):
+        """Close all handles"""
+        with self._lock:
+            for reader in self.readers.values():
+                reader.close()
+            self.readers = {}  # thread ident: handle
+            self.local = threading.local()
+        return True
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""Incremental filesystem scan of test files"""
+import os
+from time import time
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+settle_time = 2
+"""Directories modified less than settle_time seconds before the scan are always listed,
+as further changes could happen within the same mtime"""
+
+
+def stat_key(st):
+    """Values identifying a file version: (size, mtime, inode)"""
+    return (st.st_size, st.st_mtime, st.st_ino)
+
+
+def list_dir(path, ext):
+    """List `path`. Returns (subdirs, {file: stat_key}) for files ending with `ext`"""
+    dirs, files = [], {}
+    if scandir:
+        for entry in scandir(path):
+            if entry.is_dir(follow_symlinks=False):
+                dirs.append(entry.path)
+            elif entry.name.endswith(ext):
+                files[entry.path] = stat_key(entry.stat())
+        return dirs, files
+    for name in os.listdir(path):
+        p = os.path.join(path, name)
+        if os.path.isdir(p) and not os.path.islink(p):
+            dirs.append(p)
+        elif name.endswith(ext):
+            files[p] = stat_key(os.stat(p))
+    return dirs, files
+
+
+def scan(paths, ext, known={}):
+    """Scan `paths` recursively for files ending with `ext`.
+    `known` maps directories found by a previous scan to (mtime, subdirs, files):
+    directories whose mtime did not change are not listed again,
+    their known subdirs are visited and their known files are only stat-ed.
+    Returns the new `known` mapping and {file: stat_key}."""
+    now = time()
+    dirs, stats = {}, {}
+    stack = [os.path.normpath(p) for p in paths]
+    while stack:
+        path = stack.pop()
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            continue
+        old = known.get(path)
+        if old and old[0] == mtime and now - mtime > settle_time:
+            subdirs, files = old[1], {}
+            for f in old[2]:
+                try:
+                    files[f] = stat_key(os.stat(f))
+                except OSError:
+                    # Deleted file: the directory will be listed next time
+                    mtime = -1
+        else:
+            try:
+                subdirs, files = list_dir(path, ext)
+            except OSError:
+                continue
+        dirs[path] = (mtime, sorted(subdirs), sorted(files.keys()))
+        stats.update(files)
+        stack += subdirs
+    return dirs, stats
@@ -4,6 +4,8 @@ import unittest
 import os
 import shutil
 import sqlite3
+import threading
+from time import sleep
 
 from tables.file import _open_files
 
@@ -47,6 +49,120 @@ class Indexer(unittest.TestCase):
         self.indexer.rebuild()
         self.assertEqual(2, self.indexer.get_len())
 
+    def test_rebuild_parallel(self):
+        options = self.indexer.get_len('option_String')
+        self.assertGreater(options, 0)
+        self.indexer.rebuild(parallel=2)
+        self.assertEqual(2, self.indexer.get_len())
+        self.assertEqual(2, self.indexer.get_len('modify_dates'))
+        self.assertEqual(2, self.indexer.get_len('incremental_ids'))
+        self.assertEqual(options, self.indexer.get_len('option_String'))
+        self.assertEqual(0, self.indexer.rebuild_parallel([], 1))
+
+    def test_refresh(self):
+        self.assertTrue(self.indexer.refresh())
+        self.assertEqual(2, self.indexer.get_len())
+        self.assertEqual(2, self.indexer.get_len('scan_files'))
+        full_h5path = os.path.join(cur_dir, 'files', 'dummy3.h5')
+        shutil.copyfile(os.path.join(cur_dir, 'other-files', 'dummy3.h5'), full_h5path)
+        # Files skipped by an abort are indexed by the next refresh
+        idx = self.indexer
+
+        def abort(changed, database):
+            idx.aborted = True
+            return []
+        idx.add_changed_files = abort
+        self.assertFalse(idx.refresh())
+        self.assertEqual(2, idx.get_len('scan_files'))
+        del idx.add_changed_files
+        self.indexer.refresh()
+        self.assertEqual(3, self.indexer.get_len())
+        # Modified file is re-indexed
+        self.indexer.change_column_on_database('name', 'old', 'cd3c070164561106e9b001888edc38fc')
+        st = os.stat(full_h5path)
+        os.utime(full_h5path, (st.st_atime, st.st_mtime + 10))
+        self.indexer.refresh()
+        self.assertEqual(3, self.indexer.get_len())
+        self.assertEqual(0, len(self.indexer.query({'name': 'old'})))
+        # Files deleted after scanning are skipped
+        os.utime(full_h5path, (st.st_atime, st.st_mtime + 20))
+        scan = indexer.scan.scan
+
+        def scan_and_remove(*a):
+            r = scan(*a)
+            os.remove(full_h5path)
+            return r
+        indexer.scan.scan = scan_and_remove
+        try:
+            self.assertTrue(self.indexer.refresh())
+        finally:
+            indexer.scan.scan = scan
+        self.indexer.refresh()
+        self.assertEqual(2, self.indexer.get_len())
+        self.assertEqual(2, self.indexer.get_len('scan_files'))
+
+    def wait_len(self, n, timeout=10):
+        for i in range(int(timeout / 0.1)):
+            if self.indexer.get_len() == n:
+                break
+            sleep(0.1)
+        return self.indexer.get_len()
+
+    def test_watch(self):
+        backend = indexer.watcher.PollingBackend(paths, '.h5', interval=0.1)
+        self.indexer.start_watch(backend, debounce=0.2)
+        full_h5path = os.path.join(cur_dir, 'files', 'dummy3.h5')
+        shutil.copyfile(os.path.join(cur_dir, 'other-files', 'dummy3.h5'), full_h5path)
+        self.assertEqual(3, self.wait_len(3))
+        os.remove(full_h5path)
+        self.assertEqual(2, self.wait_len(2))
+        self.assertTrue(self.indexer.stop_watch())
+        self.assertFalse(self.indexer.watcher)
+
+    def test_update_file(self):
+        self.indexer.refresh()
+        full_h5path = os.path.join(cur_dir, 'files', 'dummy3.h5')
+        shutil.copyfile(os.path.join(cur_dir, 'other-files', 'dummy3.h5'), full_h5path)
+        try:
+            self.assertTrue(self.indexer.update_file(full_h5path))
+            stats = self.indexer.get_scan_state()[1]
+            self.assertIn(os.path.normpath(full_h5path), stats)
+            self.assertEqual(3, self.indexer.get_len())
+        finally:
+            os.remove(full_h5path)
+        self.assertFalse(self.indexer.update_file(full_h5path))
+        self.assertNotIn(os.path.normpath(full_h5path), self.indexer.get_scan_state()[1])
+        self.assertEqual(2, self.indexer.get_len())
+
+    def test_persistent(self):
+        idx = indexer.Indexer(dbPath, paths=paths, persistent=True)
+        self.assertEqual(2, idx.get_len())
+        conn = idx.conn
+        self.assertTrue(conn)
+        self.assertEqual(2, len(idx.query()))
+        self.assertIs(conn, idx.conn)
+        self.assertEqual('wal', idx.execute_fetchone('PRAGMA journal_mode')[0])
+        with idx.transaction() as cur:
+            cur.execute("update test set name='changed'")
+        self.assertEqual(2, len(idx.query({'name': 'changed'})))
+        with self.assertRaises(sqlite3.OperationalError):
+            with idx.transaction() as cur:
+                cur.execute("update test set name='rolled back'")
+                cur.execute("select * from missing_table")
+        self.assertEqual(0, len(idx.query({'name': 'rolled back'})))
+        # Connections of exited threads are closed
+        th = threading.Thread(target=idx.get_len)
+        th.start()
+        th.join()
+        self.assertEqual(2, len(idx.threads))
+        idx.prune_threads()
+        self.assertEqual(1, len(idx.threads))
+        idx.close()
+        self.assertFalse(idx.threads)
+        # WAL is only kept while persistent connections are used
+        self.assertEqual(2, self.indexer.get_len())
+        self.assertEqual('delete', self.indexer.execute_fetchone('PRAGMA journal_mode')[0])
+
     def test_header(self):
         header = self.indexer.header()
         self.assertEqual(['file', 'serial', 'uid', 'id', 'zerotime', 'instrument',
@@ -128,6 +244,37 @@ class Indexer(unittest.TestCase):
         self.assertTrue('a new comment' in saved_test_record)
         self.assertEquals('a new comment', hdf_file.conf.hsm.measure['comment'])
     
+    def test_summary(self):
+        full_h5path = os.path.join(cur_dir,'files','hsm_test.h5')
+        shutil.copyfile(real_test_file, full_h5path)
+        hdf_file = SharedFile(full_h5path)
+        hdf_file.set_version()
+        hdf_file.conf.hsm.measure['name'] = 'summarized'
+        hdf_file.save_conf()
+        conf = hdf_file.versioned('/conf')
+        self.assertEqual('summarized', hdf_file.get_node_attr(conf, 'summary_name'))
+        hdf_file.close()
+        # The test row must not need the configuration tree
+        read_tree = self.indexer.read_tree
+        self.indexer.read_tree = None
+        try:
+            self.assertTrue(self.indexer.appendFile(full_h5path))
+        finally:
+            self.indexer.read_tree = read_tree
+        self.assertEqual(1, len(self.indexer.query({'name': 'summarized'})))
+        # A tree without the instrument clears the previous summary
+        hdf_file = SharedFile(full_h5path)
+        hdf_file.set_version()
+        self.assertFalse(hdf_file.save_summary(conf, {}))
+        self.assertFalse(hdf_file.has_node_attr(conf, 'summary_name'))
+        hdf_file.close()
+        # Missing options take default values
+        summary = indexer.interface.test_summary({'hsm': {'measure': {'self': {
+            'name': {'current': 'partial'}}}}}, 'hsm')
+        self.assertEqual(summary['name'], 'partial')
+        self.assertEqual(summary['nSamples'], 0)
+        self.assertEqual(indexer.interface.test_summary({}, 'hsm')['comment'], '')
+
     def test_change_name(self):
         full_h5path = os.path.join(cur_dir,'files','hsm_test.h5')
         shutil.copyfile(real_test_file, full_h5path)
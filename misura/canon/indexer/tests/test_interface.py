@@ -5,8 +5,16 @@ import unittest
 import shutil
 import os
 import tempfile
+import time
+import threading
+import pickle
+import copy
+import numpy as np
+import tables
 
-from misura.canon import indexer
+from misura.canon import indexer, csutil
+from misura.canon.indexer import conftree
+from misura.canon.indexer.corefile import shared_attr
 from misura.canon.tests import testdir
 
 print('Importing', __name__)
@@ -51,6 +59,299 @@ class SharedFile(unittest.TestCase):
         self.assertLess(abs(r2[0][0] - r[0][0]), 0.3)
         self.assertLess(abs(r2[-1][0] - r[-1][0]), 0.3)
 
+    def test_get_times(self):
+        path = '/hsm/sample0/h'
+        t = self.shared_file.col(path)[:, 0]
+        probes = [t[0] - 10, t[0], (t[3] + t[4]) / 2., t[5] + 1e-3, t[-1], t[-1] + 10]
+        expected = [csutil.find_nearest_val(t, p) for p in probes]
+        self.assertEqual(self.shared_file.get_times(path, probes), expected)
+        self.assertEqual([self.shared_file.get_time(path, p) for p in probes], expected)
+        self.assertEqual(self.shared_file.get_times(path, []), [])
+        # Columns are cached within a byte budget, and dropped when their node is written
+        index = self.shared_file.time_index
+        self.assertIn(path, index.cache)
+        self.assertEqual(index.nbytes, sum(c.nbytes for c in index.cache.values()))
+        index.max_bytes = 1
+        self.shared_file.get_time('/hsm/sample0/A', t[3])
+        self.assertEqual(list(index.cache.keys()), ['/hsm/sample0/A'])
+        index.max_bytes = 2**20
+        self.shared_file.get_time(path, t[3])
+        self.shared_file.append_to_node(path, self.shared_file.col(path, slice(-1, None)))
+        self.assertNotIn(path, index.cache)
+        self.assertIn('/hsm/sample0/A', index.cache)
+
+    def test_search(self):
+        path = '/hsm/sample0/h'
+        t, v = self.shared_file.col(path).transpose()
+        i = v.argmax()
+        self.assertEqual(self.shared_file.max(path), (i, t[i], v[i]))
+        i = v.argmin()
+        self.assertEqual(self.shared_file.min(path), (i, t[i], v[i]))
+        i = abs(v - v[7] - 0.01).argmin()
+        self.assertEqual(self.shared_file.nearest(path, v[7] + 0.01)[0], i)
+        self.assertEqual(self.shared_file.equals(path, v[5])[0], list(v).index(v[5]))
+        # Window limited by start time
+        j = 10
+        m = (v[j:].max() + v[j:].min()) / 2.
+        i = j + list(v[j:] > m).index(True)
+        self.assertEqual(self.shared_file.rises(path, m, t[j])[0], i)
+        i = j + list(v[j:] < m).index(True)
+        self.assertEqual(self.shared_file.drops(path, m, t[j])[0], i)
+        self.assertFalse(self.shared_file.rises(path, v.max() + 1))
+
+    def test_reduce(self):
+        # Small chunks, so that reductions span several blocks
+        self.shared_file.block_chunks = 2
+        t = np.arange(100) * 1.
+        v = np.sin(t / 10.) * 10 + t / 10.
+        arr = np.array(list(zip(t, v)), dtype=[('t', 'f8'), ('v', 'f8')])
+        self.shared_file.test.create_table('/', 'blocks', obj=arr, chunkshape=(7,))
+        path = '/blocks'
+        sf = self.shared_file
+        self.assertEqual(sf.reduce(path, 'max'), v.max())
+        self.assertEqual(sf.reduce(path, 'min', start_time=20), v[20:].min())
+        self.assertAlmostEqual(sf.reduce(path, 'mean'), v.mean())
+        self.assertAlmostEqual(sf.reduce(path, 'std', start_time=3, end_time=90), v[3:90].std())
+        i = v.argmax()
+        self.assertEqual(sf.reduce(path, 'argmax'), (i, t[i], v[i]))
+        self.assertEqual(sf.max(path), (i, t[i], v[i]))
+        i = 30 + v[30:].argmin()
+        self.assertEqual(sf.min(path, start_time=30), (i, t[i], v[i]))
+        i = abs(v - 3.3).argmin()
+        self.assertEqual(sf.nearest(path, 3.3)[0], i)
+        i = 40 + list(v[40:] > 9).index(True)
+        self.assertEqual(sf.rises(path, 9, 40)[0], i)
+        self.assertFalse(sf.reduce(path, 'drops', v.min() - 1))
+        self.assertEqual(sf.equals(path, v[50])[0], 50)
+        self.assertFalse(sf.equals(path, v.max() + 1))
+        self.assertRaises(NotImplementedError, indexer.kernels.Reduction().update, v, 0)
+        # Generic search calls op once on the whole window
+        op = lambda y: (y, y[0] + 5)
+        i = 20 + list(v[20:] > v[20] + 5).index(True)
+        self.assertEqual(sf.search(path, op, 'x>y', start_time=20), (i, t[i], v[i]))
+        op = lambda y: (y, y.max())
+        self.assertEqual(sf.search(path, op)[0], v.argmax())
+        self.assertEqual(len(sf.col(path, slice(5, 20))), 15)
+        self.assertEqual(list(sf.col(path, -1)), [t[-1], v[-1]])
+
+    def test_lod(self):
+        t = np.arange(2050) * 1.
+        v = np.sin(t / 100.)
+        arr = np.array(list(zip(t, v)), dtype=[('t', 'f8'), ('v', 'f8')])
+        sf = self.shared_file
+        sf.test.create_table('/', 'lod', obj=arr[:1005])
+        path = '/lod'
+        self.assertEqual(sf.update_lod(path), 100 + 10 + 1)
+        # Incremental extension
+        sf.test.root.lod.append(arr[1005:])
+        self.assertEqual(sf.update_lod(path), 105 + 10 + 1)
+        lv1 = sf.test.get_node('/userdata/lod/l10/lod')
+        lv3 = sf.test.get_node('/userdata/lod/l1000/lod')
+        self.assertEqual(lv1.nrows, 205)
+        self.assertEqual(lv3.nrows, 2)
+        self.assertAlmostEqual(lv1[3]['t'], t[30:40].mean())
+        self.assertAlmostEqual(lv1[3]['v'], v[30:40].mean())
+        self.assertEqual(lv3[1]['min'], v[1000:2000].min())
+        self.assertEqual(lv3[1]['max'], v[1000:2000].max())
+        # Level picking
+        self.assertEqual(len(sf.query_time(path, 0, 1000)), 1000)
+        r = sf.query_time(path, 0, 1000, max_points=100)
+        self.assertEqual(len(r), 100)
+        self.assertEqual(r[-1]['max'], v[990:1000].max())
+        # Incomplete last bucket is reduced from raw data
+        r = sf.query_time(path, 1990, 2049, max_points=100)
+        self.assertEqual(len(r), 59)
+        self.assertEqual(r[-1]['max'], v[2048])
+        # Exact count: buckets are merged, keeping min and max
+        for n in (100, 30, 7, 1):
+            r = sf.query_time(path, max_points=n)
+            self.assertEqual(len(r), n)
+            self.assertEqual(r['min'].min(), v.min())
+            self.assertEqual(r['max'].max(), v.max())
+        r = sf.query_time(path, 0, 999, max_points=100)
+        self.assertEqual(len(r), 100)
+        self.assertEqual(r['max'].max(), v[:999].max())
+        self.assertEqual(r[0]['min'], v[0])
+        # Empty windows
+        self.assertEqual(len(sf.query_time(path, 100., 100.5, max_points=100)), 0)
+        self.assertEqual(len(sf.query_time(path, 3000., 4000., max_points=100)), 0)
+        # Same row format at all levels
+        r = sf.query_time(path, 0, 10, max_points=100)
+        self.assertEqual(r.dtype.names, ('t', 'v', 'min', 'max'))
+        self.assertEqual(list(r['min']), list(v[:10]))
+        # Queries do not extend the pyramid
+        extra = arr[:100].copy()
+        extra['t'] += 2050
+        sf.test.root.lod.append(extra)
+        sf.query_time(path, max_points=30)
+        self.assertEqual(lv1.nrows, 205)
+        # Pyramid is removed with its node
+        sf.remove_node(path)
+        self.assertFalse(sf.has_node('/userdata/lod/l10/lod'))
+
+    def test_write_behind(self):
+        sf = self.shared_file
+        dt = [('t', 'f8'), ('v', 'f8')]
+        sf.test.create_table('/', 'wb', description=np.dtype(dt))
+        path = '/wb'
+        sf.start_write_behind(interval=60)
+        for i in range(10):
+            sf.append_to_node(path, np.array([(i, i * 2)], dtype=dt))
+        # Queued, not yet written
+        self.assertEqual(sf.len(path), 0)
+        sf.sync()
+        self.assertEqual(sf.len(path), 10)
+        self.assertEqual(list(sf.col(path, 9)), [9, 18])
+        # Size threshold triggers a flush
+        sf.write_buffer.flush_bytes = 100
+        sf.append_to_node(path, np.zeros(10, dtype=dt))
+        sf.write_buffer.sync()
+        self.assertEqual(sf.len(path), 20)
+        # Pending data is written on close
+        sf.append_to_node(path, np.zeros(5, dtype=dt))
+        sf.close()
+        self.assertFalse(sf.write_buffer)
+        sf.open_file(self.test_file)
+        self.assertEqual(sf.len(path), 25)
+        # Appends to a buffer stopped meanwhile are written synchronously
+        sf.start_write_behind(interval=60)
+        sf.write_buffer.stop()
+        sf.append_to_node(path, np.zeros(2, dtype=dt))
+        self.assertEqual(sf.len(path), 27)
+        sf.stop_write_behind()
+        # Reopening keeps write-behind enabled
+        sf.start_write_behind(interval=60)
+        sf.reopen()
+        self.assertEqual(sf.write_buffer.interval, 60)
+        sf.append_to_node(path, np.zeros(3, dtype=dt))
+        sf.sync()
+        self.assertEqual(sf.len(path), 30)
+        sf.stop_write_behind()
+        # Batches keep their rows flag, and times aligned with rows
+        calls = []
+        buf = indexer.writebehind.WriteBuffer(lambda *a: calls.append(a), interval=60)
+        buf.put('/a', ['r1'], rows=True, times=[1.])
+        buf.put('/a', ['r2'], rows=True)
+        buf.put('/a', ['r3', 'r4'], rows=True, times=[3., 4.])
+        buf.put('/a', ['r5'], rows=True, times=[5.])
+        buf.put('/a', 'data')
+        buf.sync()
+        self.assertEqual(calls, [('/a', True, ['r1'], [1.]),
+                                 ('/a', True, ['r2'], None),
+                                 ('/a', True, ['r3', 'r4', 'r5'], [3., 4., 5.]),
+                                 ('/a', False, ['data'], None)])
+        buf.stop()
+        # Failed writes are retried, then dropped
+        failures = [IOError('busy')]
+
+        def write(*a):
+            if failures:
+                raise failures.pop()
+            calls.append(a)
+        calls = []
+        buf = indexer.writebehind.WriteBuffer(write, interval=60)
+        buf.put('/b', 'x')
+        self.assertTrue(buf.stop())
+        self.assertEqual(calls, [('/b', False, ['x'], None)])
+        failures = [IOError('broken')] * 3
+        buf = indexer.writebehind.WriteBuffer(write, interval=60, retries=1)
+        buf.put('/b', 'y')
+        self.assertFalse(buf.stop())
+        self.assertEqual(buf.dropped, 1)
+        self.assertEqual(len(calls), 1)
+
+    def test_frame_cache(self):
+        sf = self.shared_file
+        path = '/hsm/sample0/profile'
+        cache = indexer.framecache.FrameCache()
+        sf.frame_cache = cache
+        f = sf.get_frame(path, 10)
+        t, ((w, h), x, y) = f
+        self.assertEqual(t, sf.decode_frame(path, 10)[0])
+        self.assertEqual(cache.misses, 1)
+        # Returned frames are copies
+        x[:] = 0
+        t1, ((w1, h1), x1, y1) = sf.get_frame(path, 10)
+        self.assertEqual(cache.hits, 1)
+        self.assertTrue(x1.any())
+        # Negative indexes are resolved
+        sf.get_frame(path, -1)
+        self.assertIn((sf.get_path(), path, sf.len(path) - 1), cache)
+        # Read-ahead
+        for i in range(100):
+            if (sf.get_path(), path, 12) in cache:
+                break
+            time.sleep(0.01)
+        self.assertIn((sf.get_path(), path, 12), cache)
+        # Budget
+        cache.budget = cache.size
+        cache.put('extra', np.zeros(10))
+        self.assertLessEqual(cache.size, cache.budget)
+        self.assertIn('extra', cache)
+        cache.invalidate(sf.get_path(), '/hsm')
+        self.assertEqual(list(cache.frames.keys()), ['extra'])
+        # Read-ahead queued before an invalidation is cancelled
+        cache.queue.put(('stale', lambda: np.zeros(1), cache.generation - 1))
+        cache.prefetch('fresh', lambda: np.zeros(1))
+        for i in range(100):
+            if 'fresh' in cache:
+                break
+            time.sleep(0.01)
+        self.assertIn('fresh', cache)
+        self.assertNotIn('stale', cache)
+        # Explicit decoder, undecoded rows for unknown classes
+        node = sf.test.get_node(path)
+        self.assertEqual(sf.decode_frame(path, 10, decode=len), len(node[10]))
+        node.attrs._reference_class = 'Unknown'
+        self.assertTrue((sf.decode_frame(path, 10) == node[10]).all())
+
+    def test_reader(self):
+        # Writable files are not reopened
+        self.assertIs(self.shared_file.reader(), self.shared_file)
+        self.shared_file.close()
+        sf = indexer.SharedFile(self.test_file, mode='r')
+        path = '/hsm/sample0/h'
+        expected = sf.col(path)
+        readers = {}
+
+        def read(i):
+            r = sf.reader()
+            readers[i] = (r, r.col(path))
+        threads = [threading.Thread(target=read, args=(i,)) for i in range(3)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        self.assertEqual(len(set(id(r) for r, c in readers.values())), 3)
+        for r, c in readers.values():
+            self.assertFalse(r.writable())
+            self.assertTrue((c == expected).all())
+        # Same thread, same handle. Handles of exited threads are closed.
+        self.assertIs(sf.reader(), sf.reader())
+        self.assertEqual(len(sf.reader_pool.readers), 1)
+        self.assertFalse(readers[1][0].isopen())
+        sf.close()
+        self.assertFalse(sf.reader_pool)
+        self.assertFalse(readers[0][0].isopen())
+
+    def test_node_cache(self):
+        sf = self.shared_file
+        cache = sf.node_cache
+        cache.clear()
+        cache.size = 3
+        for p in ('/hsm/sample0/h', '/hsm/sample0/A', '/hsm/sample0/h', '/conf', '/hsm/sample0/profile'):
+            sf.get_node(p)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 4)
+        self.assertEqual(list(cache.nodes.keys()), ['/hsm/sample0/h', '/conf', '/hsm/sample0/profile'])
+        # Hard links are cached
+        sf.link('/linked', '/hsm/sample0/h')
+        sf.get_node('/linked')
+        self.assertIn('/linked', cache)
+        sf.remove_node('/hsm/sample0')
+        self.assertEqual(list(cache.nodes.keys()), ['/conf', '/linked'])
+        self.assertEqual(sf.len('/linked'), len(sf.get_node('/linked')))
+
     def test_versions(self):
         shared_file = indexer.SharedFile(self.test_file)
         # Empty version
@@ -83,6 +384,156 @@ class SharedFile(unittest.TestCase):
         self.assertEqual(shared_file.get_version(), '/ver_1')
         self.assertEqual(shared_file.conf['name'], nname)
 
+    def test_conf_columnar(self):
+        sf = self.shared_file
+        sf.conf_format = 'columnar'
+        sf.set_version()
+        tree = copy.deepcopy(sf.conf.tree())
+        oname = tree['hsm']['measure']['self']['name']['current']
+        # Versions only store devices changed from their parent, and no pickled tree
+        sf.create_version('delta')
+        sf.conf.hsm.measure['name'] = 'changed'
+        sf.save_conf()
+        self.assertTrue(sf.has_node('/conf_devices'))
+        self.assertEqual(sf.conf_device('/hsm/', version=''), tree['hsm']['self'])
+        self.assertFalse(sf.conf_device('/missing/'))
+        self.assertEqual(len(sf.file_node('/ver_1/conf')), 0)
+        self.assertEqual(sf.get_node_attr('/ver_1/conf_devices', 'base'), '')
+        delta = conftree.read(sf.test.get_node('/ver_1/conf_devices'))
+        self.assertIn('/hsm/measure/', delta)
+        self.assertLess(len(delta), len(sf.read_conf_devices('')) / 2)
+        self.assertEqual(sf.get_node_attr('/ver_1/conf', 'summary_name'), 'changed')
+        self.assertEqual(sf.conf_device('/hsm/measure/')['name']['current'], 'changed')
+        self.assertEqual(sf.conf_device('/hsm/measure/', version='')['name']['current'], oname)
+        self.assertEqual(sf.conf_tree(version='')['hsm']['measure']['self']['name']['current'], oname)
+        self.assertEqual(sf.conf_devices()['/hsm/measure/']['name']['current'], 'changed')
+        # Switching versions rebuilds the tree from columnar storage
+        sf.set_version('')
+        self.assertEqual(sf.conf.hsm.measure['name'], oname)
+        sf.set_version('/ver_1')
+        self.assertEqual(sf.conf.hsm.measure['name'], 'changed')
+        self.assertEqual(pickle.loads(sf.xmlrpc_conf_tree().data)
+                         ['hsm']['measure']['self']['name']['current'], 'changed')
+        # Rewriting the parent rebases deltas computed from it
+        stamp = sf.get_node_attr('/ver_1/conf_devices', 'stamp')
+        sf.set_version('')
+        sf.conf.hsm.measure['name'] = 'rewritten'
+        sf.save_conf()
+        self.assertEqual(sf.get_node_attr('/ver_1/conf_devices', 'stamp'), stamp)
+        self.assertEqual(sf.get_node_attr('/ver_1/conf_devices', 'base_stamp'),
+                         sf.get_node_attr('/conf_devices', 'stamp'))
+        self.assertLess(len(conftree.read(sf.test.get_node('/ver_1/conf_devices'))), len(delta) + 2)
+        self.assertEqual(sf.conf_device('/hsm/measure/', version='/ver_1')['name']['current'], 'changed')
+        self.assertEqual(sf.conf_device('/hsm/measure/', version='')['name']['current'], 'rewritten')
+        # Pickle rewrites keep existing columnar storage current
+        sf.conf_format = 'pickle'
+        sf.conf.hsm.measure['name'] = 'pickled'
+        sf.save_conf()
+        self.assertEqual(sf.read_conf_device('', '/hsm/measure/')['name']['current'], 'pickled')
+        self.assertEqual(sf.conf_device('/hsm/measure/', version='/ver_1')['name']['current'], 'changed')
+
+    def test_version_copy_on_write(self):
+        sf = self.shared_file
+        sf.set_version()
+        path = '/hsm/sample0/h'
+        spath = '/summary' + path
+        t, v = sf.col(spath).transpose()
+        sf.create_version('first')
+        # First-level versions link the nodes of the original version
+        wpath = '/summary/hsm/sample0/w'
+        self.assertIn(shared_attr, sf.get_attributes('/ver_1' + wpath))
+        sf.set_attributes('/ver_1' + wpath, attrs={'cow': 1})
+        self.assertIn('/ver_1' + wpath, sf._owned)
+        self.assertNotIn(shared_attr, sf.get_attributes('/ver_1' + wpath))
+        self.assertNotIn('cow', sf.get_attributes(wpath))
+        sf.conf.hsm.measure['name'] = 'first'
+        sf.save_conf()
+        sf.save_data(path, v * 2, t)
+        self.assertTrue(sf.has_node('/ver_1/summary/hsm/sample0/h'))
+        # Second version shares nodes of the first one
+        sf.create_version('second')
+        self.assertEqual(sf.get_version(), '/ver_2')
+        self.assertEqual(sf.get_node_attr('/ver_2', 'parent'), '/ver_1')
+        self.assertTrue(sf.has_node('/ver_2/summary/hsm/sample0/h'))
+        np.testing.assert_array_equal(sf.col(spath)[:, -1], v * 2)
+        self.assertIn('/ver_2/summary/hsm/sample0/h', sf.header(['FixedTimeArray'], version='/ver_2'))
+        sf.load_conf()
+        self.assertEqual(sf.conf.hsm.measure['name'], 'first')
+        # Attributes and appends on a linked node do not alter the first version
+        vpath = '/ver_2' + spath
+        n = sf.len(vpath)
+        sf.set_attributes(vpath, attrs={'cow': 1})
+        sf.append_to_node(vpath, sf.col(vpath, slice(0, 1)))
+        self.assertEqual(sf.len(vpath), n + 1)
+        self.assertEqual(sf.len('/ver_1' + spath), n)
+        self.assertNotIn('cow', sf.get_attributes('/ver_1' + spath))
+        self.assertEqual(sf.get_attributes(vpath)['cow'], 1)
+        self.assertIn(vpath, sf._owned)
+        # Writing the second version leaves the first untouched
+        sf.save_data(path, v * 3, t)
+        sf.conf.hsm.measure['name'] = 'second'
+        sf.save_conf()
+        np.testing.assert_array_equal(sf.col(spath)[:, -1], v * 3)
+        sf.set_version(1)
+        np.testing.assert_array_equal(sf.col(spath)[:, -1], v * 2)
+        self.assertEqual(sf.conf.hsm.measure['name'], 'first')
+
+    def test_versioned_cache(self):
+        sf = self.shared_file
+        sf.set_version()
+        path = '/summary/hsm/sample0/h'
+        t, v = sf.col(path).transpose()
+        sf.create_version('cached')
+        # Nodes of the original version are linked into the new one
+        self.assertEqual(sf.versioned(path), '/ver_1' + path)
+        self.assertEqual(sf._version_paths['/ver_1'][path], '/ver_1' + path)
+        # Node removal
+        sf.remove_node('/ver_1' + path)
+        self.assertEqual(sf.versioned(path), path)
+        self.assertEqual(sf.versioned('/summary/hsm'), '/ver_1/summary/hsm')
+        # Node creation updates resolution
+        sf.save_data('/hsm/sample0/h', v, t)
+        self.assertEqual(sf.versioned(path), '/ver_1' + path)
+        self.assertEqual(sf.versioned(path, version=''), path)
+        h = sf.header(['Array', 'FixedTimeArray'])
+        self.assertIn('/ver_1' + path, h)
+        self.assertNotIn(path, h)
+        self.assertIn('/ver_1/summary/hsm/sample0/w', h)
+        self.assertNotIn('/summary/hsm/sample0/w', h)
+
+    def test_header_cache(self):
+        sf = self.shared_file
+        h = sf.header(refresh=True)
+        self.assertTrue(len(h) > 0)
+        self.assertFalse([n for n in sf.test.root.userdata._v_children
+                          if n.startswith('header_') and not n.startswith('header_blob_')])
+        # New nodes are appended to the cache
+        arr = np.array([(0., 1.)], dtype=[('t', 'f8'), ('v', 'f8')])
+        sf.create_table('/', 'cached', obj=arr, reference_class='Array')
+        self.assertEqual(len(sf.test.root.userdata.header_blob_Array), 2)
+        sf.open_file(self.test_file)
+        h1 = sf.header()
+        self.assertEqual(sorted(h1), sorted(h + ['/cached']))
+        # Removed nodes are appended as removal rows, compacted on refresh
+        sf.remove_node('/cached')
+        self.assertEqual(len(sf.test.root.userdata.header_blob_Array), 3)
+        sf.open_file(self.test_file)
+        self.assertEqual(sorted(sf.header()), sorted(h))
+        sf.header(refresh=True)
+        self.assertEqual(len(sf.test.root.userdata.header_blob_Array), 1)
+        # Older per-character caches are migrated on writable open
+        test = sf.test
+        test.remove_node('/userdata/header_blob_Array')
+        del test.root.userdata._v_attrs.header_classes
+        test.root.userdata._v_attrs.header = ['Array']
+        vla = test.create_vlarray('/userdata', 'header_Array', atom=tables.StringAtom(itemsize=1))
+        for path in h:
+            vla.append(list(path))
+        sf.open_file(self.test_file)
+        self.assertEqual(sorted(sf.header()), sorted(h))
+        self.assertEqual(list(sf.test.root.userdata._v_attrs.header_classes), ['Array'])
+        self.assertFalse(sf.has_node('/userdata/header_Array'))
+
     def test_should_keep_set_version(self):
         self.shared_file.create_version('a version')
 
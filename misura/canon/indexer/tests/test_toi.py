@@ -62,8 +62,14 @@ class TestTotalOptionIndexer(unittest.TestCase):
         option.ao(desc,'test5','Boolean', False)
         option.ao(desc,'test6','Meta', {'temp':861.6, 'time': 1291, 'value': 0.091})
         option.ao(desc,'test7','String', 'Seven') 
-        toi.index_desc(self.cur, 'abcde', 'ver_2', desc)  
+        n = toi.index_desc(self.cur, 'abcde', 'ver_2', desc)  
         self.conn.commit()                             
+        self.assertEqual(n, 8)
+        self.cur.execute("select count(*) from option_Boolean where uid='abcde'")
+        self.assertEqual(self.cur.fetchone()[0], 2)
+        toi.clear_test_uid(self.cur, "abcde")
+        self.cur.execute("select count(*) from option_String")
+        self.assertEqual(self.cur.fetchone()[0], 0)
         
     def test_index_tree(self):
         tree = dataimport.tree_dict()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Vectorized time-to-index lookups on Table nodes"""
+from collections import OrderedDict
+import numpy as np
+
+
+def nearest_indexes(t, values):
+    """Returns the indexes of the elements of monotonic array `t`
+    which are nearest to each of `values`."""
+    values = np.asarray(values, dtype=np.float64)
+    n = len(t)
+    if n <= 1:
+        return np.zeros(values.shape, dtype=np.int64)
+    descending = t[-1] < t[0]
+    if descending:
+        t = t[::-1]
+    right = np.searchsorted(t, values).clip(1, n - 1)
+    left = right - 1
+    # Prefer the lower index when equally distant
+    idx = np.where(values - t[left] <= t[right] - values, left, right)
+    if descending:
+        idx = n - 1 - idx
+    return idx
+
+
+def has_time_column(node):
+    """Check if `node` is a Table with a `t` time column"""
+    return 't' in getattr(node, 'colnames', ())
+
+
+tindex_root = '/userdata/tindex'
+"""Root group of persistent time indexes for variable-length nodes"""
+
+
+def tindex_path(path):
+    """Returns the location of the persistent time index of node `path`"""
+    return tindex_root + path
+
+
+class TimeIndex(object):
+
+    """Least recently used cache of the time columns of Table nodes, bounded in bytes.
+    Each column is read once and then incrementally extended
+    with the rows appended after the last lookup."""
+
+    def __init__(self, max_bytes=64 * 2**20):
+        self.max_bytes = max_bytes
+        """Maximum total size of cached columns"""
+        self.cache = OrderedDict()
+        self.nbytes = 0
+
+    def column(self, node, path=False, read=None):
+        """Returns the time column of `node` as a float64 array.
+        `read` is an optional function returning the times of the rows starting from its argument index."""
+        if path is False:
+            path = node._v_pathname
+        if read is None:
+            read = lambda start: node.read(start=start, field='t')
+        n = node.nrows
+        t = self.cache.pop(path, None)
+        if t is not None:
+            self.nbytes -= t.nbytes
+        if t is None or len(t) > n:
+            t = read(0)
+        elif len(t) < n:
+            t = np.concatenate((t, read(len(t))))
+        t = t.astype(np.float64, copy=False)
+        self._put(path, t)
+        return t
+
+    def _put(self, path, t):
+        """Cache `t` as the most recently used column, evicting the least recently used
+        ones beyond max_bytes. The latest column is always kept."""
+        self.cache[path] = t
+        self.nbytes += t.nbytes
+        while self.nbytes > self.max_bytes and len(self.cache) > 1:
+            old = self.cache.popitem(last=False)[1]
+            self.nbytes -= old.nbytes
+
+    def invalidate(self, path=False):
+        """Forget cached columns for `path` and its children, or all columns if False"""
+        if path is False:
+            self.cache = OrderedDict()
+            self.nbytes = 0
+            return True
+        path = path.rstrip('/')
+        for key in list(self.cache.keys()):
+            if key == path or key.startswith(path + '/'):
+                self.nbytes -= self.cache.pop(key).nbytes
+        return True
@@ -110,14 +110,22 @@ def drop_tables(cursor):
         
 def clear_test_uid(cursor, uid):
     """Remove test UID entries from all tables"""
+    return clear_test_uids(cursor, [uid])
+
+def clear_test_uids(cursor, uids):
+    """Remove entries of all `uids` from all tables"""
+    vals = [(uid,) for uid in uids]
     for tab_name in toi_tables.keys():
-        cmd = "delete from '{}' where uid='{}';".format(tab_name, uid)
-        logging.debug(cmd)
-        cursor.execute(cmd)
+        cursor.executemany("delete from '{}' where uid=?;".format(tab_name), vals)
     return True
 
-def index_option(cursor, uid, version, path, mro, opt):
-    """Insert an option into its table"""
+insert_cmds = {}
+for tab_name, (listdef, current_func, unique_def) in toi_tables.items():
+    insert_cmds[tab_name] = "insert or replace into '{}' ({}) values ({});".format(
+        tab_name, get_column_names(listdef), ('?,' * len(listdef))[:-1])
+
+def option_row(uid, version, path, mro, opt):
+    """Returns the (table name, values) row of an option, or False if not indexable"""
     otype = aliases.get(opt['type'], opt['type'])
     tab_name = 'option_'+otype
     if tab_name not in toi_tables:
@@ -125,7 +133,6 @@ def index_option(cursor, uid, version, path, mro, opt):
         return False
     listdef, current_func, unique_def = toi_tables[tab_name]
     current_func = special_funcs.get(opt['type'], current_func)
-    colnames = get_column_names(listdef)
     try:
         currents = current_func(opt)
     except:
@@ -133,10 +140,23 @@ def index_option(cursor, uid, version, path, mro, opt):
         return False
     
     vals = [uid, version, path, mro, opt['handle']]+currents
-    q = ('?,' * len(vals))[:-1]
     assert len(listdef)==len(vals), 'Table definition differs from values provided {} {}'.format(listdef, vals)
-    cmd = "insert or replace into '{}' ({}) values ({});".format(tab_name, colnames, q)
-    cursor.execute(cmd, vals)
+    return tab_name, vals
+
+def write_rows(cursor, rows):
+    """Insert `rows` grouped by table name with one executemany per table"""
+    i = 0
+    for tab_name, vals in rows.items():
+        cursor.executemany(insert_cmds[tab_name], vals)
+        i += len(vals)
+    return i
+
+def index_option(cursor, uid, version, path, mro, opt):
+    """Insert an option into its table"""
+    row = option_row(uid, version, path, mro, opt)
+    if not row:
+        return False
+    cursor.execute(insert_cmds[row[0]], row[1])
     return True
 
 mro_blacklist = set(['XMLRPC', 'ConfigurationInterface', 'Node', 'Aggregative', 'Scriptable', 'Device', 'Measurer'])
@@ -145,8 +165,8 @@ def clean_mro(mro):
     mro = filter(lambda cls: cls not in mro_blacklist, mro[:])
     return '.'.join(mro[::-1])
 
-def index_desc(cursor, uid, version, desc):
-    """Parse a full configuration dictionary"""
+def collect_desc(rows, uid, version, desc):
+    """Add rows of all options in a configuration dictionary to `rows` table name: values mapping"""
     fullpath = desc['fullpath']['current']
     mro = ''
     if 'mro' in desc:
@@ -155,20 +175,38 @@ def index_desc(cursor, uid, version, desc):
     for handle, opt in desc.items():
         if handle == 'self':
             continue
-        i += index_option(cursor, uid, version, fullpath, mro, opt)
+        row = option_row(uid, version, fullpath, mro, opt)
+        if not row:
+            continue
+        rows.setdefault(row[0], []).append(row[1])
+        i += 1
     return i
 
-def index_tree(cursor, uid, version, tree):
-    """Index all current values of options contained in tree"""
+def collect_tree(rows, uid, version, tree):
+    """Add rows of all options contained in tree to `rows`"""
+    i = 0
     for k, sub in tree.items():
         if k == 'self':
             try:
-                index_desc(cursor, uid, version, sub)
+                i += collect_desc(rows, uid, version, sub)
             except:
                 logging.warning(format_exc())
             continue
         # Auto-iterate
-        index_tree(cursor, uid, version, sub)
+        i += collect_tree(rows, uid, version, sub)
+    return i
+
+def index_desc(cursor, uid, version, desc):
+    """Parse a full configuration dictionary"""
+    rows = {}
+    collect_desc(rows, uid, version, desc)
+    return write_rows(cursor, rows)
+
+def index_tree(cursor, uid, version, tree):
+    """Index all current values of options contained in tree"""
+    rows = {}
+    collect_tree(rows, uid, version, tree)
+    return write_rows(cursor, rows)
 
 def reorder_date(date):
     d = date.split(', ')
@@ -192,10 +230,7 @@ def index_plots(cursor, shfile, version=''):
         script = shfile.file_node(script_path)
         plot_hash = hashlib.md5(script).hexdigest()
         vals = [plot_hash, shfile.uid, version, plot_name, title, reorder_date(date), script]
-        colnames = get_column_names(toi_tables['plots'][0])
-        q = ('?,' * len(vals))[:-1]
-        cmd = "insert or replace into 'plots' ({}) values ({});".format(colnames, q)
-        cursor.execute(cmd, vals)
+        cursor.execute(insert_cmds['plots'], vals)
         i += 1
     return i
 
@@ -203,15 +238,12 @@ def index_version(cursor, shfile, path='', name='Original', date='', active=Fals
     """ Index a specific verson with index_tree
     populate versions and plots tables"""
     logging.debug('index_version', path, name, date)
-    tree = shfile.conf_tree(path=shfile._versioned('/conf', version=path))
+    tree = shfile.conf_tree(version=path)
     index_tree(cursor, shfile.uid, path, tree)
     index_plots(cursor, shfile, path)
     # versions table entry
-    colnames = get_column_names(toi_tables['versions'][0])
     vals = [shfile.uid, path, name, reorder_date(date), active]
-    q = ('?,' * len(vals))[:-1]
-    cmd = "insert or replace into 'versions' ({}) values ({});".format(colnames, q)
-    cursor.execute(cmd, vals)
+    cursor.execute(insert_cmds['versions'], vals)
     return True
 
 def index_file(cursor, shfile):
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""Watch test paths and keep the database index current"""
+import threading
+from time import time
+from traceback import print_exc
+try:
+    import pyinotify
+except ImportError:
+    pyinotify = None
+
+from . import scan
+
+
+class PollingBackend(object):
+
+    """Detect created, modified and deleted files by periodically scanning paths.
+    Works on network shares, where inotify events are not delivered."""
+
+    def __init__(self, paths, ext, interval=5.):
+        self.paths = paths
+        self.ext = ext
+        self.interval = interval
+        self.known = {}
+        self.stats = {}
+        self.callback = False
+        self._stop = threading.Event()
+        self.thread = False
+
+    def start(self, callback):
+        """Start polling, calling `callback(kind, path)` for each change"""
+        self.callback = callback
+        self.known, self.stats = scan.scan(self.paths, self.ext)
+        self._stop.clear()
+        self.thread = threading.Thread(target=self.run, name='PollingBackend')
+        self.thread.daemon = True
+        self.thread.start()
+        return True
+
+    def poll(self):
+        """Scan paths once and notify changes since last scan"""
+        dirs, stats = scan.scan(self.paths, self.ext, self.known)
+        for f, key in stats.items():
+            old = self.stats.get(f)
+            if old is None:
+                self.callback('created', f)
+            elif old != key:
+                self.callback('modified', f)
+        for f in self.stats:
+            if f not in stats:
+                self.callback('deleted', f)
+        self.known, self.stats = dirs, stats
+        return True
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except:
+                print_exc()
+
+    def stop(self):
+        self._stop.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = False
+        return True
+
+
+class InotifyBackend(object):
+
+    """Receive file events from the kernel via pyinotify"""
+
+    def __init__(self, paths, ext):
+        self.paths = paths
+        self.ext = ext
+        self.notifier = False
+
+    def start(self, callback):
+        """Watch paths recursively, calling `callback(kind, path)` for each change"""
+        ext = self.ext
+        deleted = pyinotify.IN_DELETE | pyinotify.IN_MOVED_FROM
+
+        class Handler(pyinotify.ProcessEvent):
+
+            def process_default(self, event):
+                if event.dir or not event.pathname.endswith(ext):
+                    return
+                callback('deleted' if event.mask & deleted else 'modified', event.pathname)
+
+        wm = pyinotify.WatchManager()
+        self.notifier = pyinotify.ThreadedNotifier(wm, Handler())
+        self.notifier.daemon = True
+        self.notifier.start()
+        mask = pyinotify.IN_CLOSE_WRITE | pyinotify.IN_MOVED_TO | deleted
+        for path in self.paths:
+            wm.add_watch(path, mask, rec=True, auto_add=True)
+        return True
+
+    def stop(self):
+        if self.notifier:
+            self.notifier.stop()
+            self.notifier = False
+        return True
+
+
+def default_backend(paths, ext):
+    """InotifyBackend if pyinotify is available, otherwise PollingBackend"""
+    if pyinotify:
+        return InotifyBackend(paths, ext)
+    return PollingBackend(paths, ext)
+
+
+class Watcher(object):
+
+    """Collect file events from a `backend` and pass each path to `update(path)`
+    once no further event was received for `debounce` seconds."""
+
+    def __init__(self, update, backend, debounce=10.):
+        self.update = update
+        self.backend = backend
+        self.debounce = debounce
+        self.pending = {}
+        """Path: (last event kind, last event time)"""
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.thread = False
+
+    def put(self, kind, path):
+        """Queue an event of `kind` (created, modified, deleted) on `path`"""
+        with self._lock:
+            self.pending[path] = (kind, time())
+
+    def ready(self, now=None):
+        """Pop and return paths whose last event is older than debounce"""
+        if now is None:
+            now = time()
+        out = []
+        with self._lock:
+            for path, (kind, t) in list(self.pending.items()):
+                if now - t >= self.debounce:
+                    out.append(path)
+                    self.pending.pop(path)
+        return out
+
+    def process(self, now=None):
+        """Update all settled paths. Returns their number."""
+        paths = self.ready(now)
+        for path in paths:
+            try:
+                self.update(path)
+            except:
+                print_exc()
+        return len(paths)
+
+    def run(self):
+        while not self._stop.wait(max(0.05, min(1., self.debounce / 2.))):
+            self.process()
+
+    def start(self):
+        self._stop.clear()
+        self.backend.start(self.put)
+        self.thread = threading.Thread(target=self.run, name='Watcher')
+        self.thread.daemon = True
+        self.thread.start()
+        return True
+
+    def stop(self):
+        """Stop receiving events and update remaining pending paths"""
+        self.backend.stop()
+        self._stop.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = False
+        self.process(now=time() + self.debounce)
+        return True
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""Write-behind buffering of node appends"""
+import threading
+from traceback import print_exc
+
+
+def nbytes(data):
+    """Approximate memory size of `data`"""
+    n = getattr(data, 'nbytes', None)
+    if n is not None:
+        return n
+    if isinstance(data, (list, tuple)):
+        return sum(nbytes(d) for d in data)
+    if hasattr(data, '__len__'):
+        return len(data)
+    return 8
+
+
+class WriteBuffer(object):
+
+    """Queue of pending appends, coalesced per node and written by a flusher thread.
+    The flusher calls `write(path, rows, chunks, times)` for each batch of a node:
+    `chunks` is the list of queued data, to be appended one by one if `rows` is True,
+    `times` the time labels of the rows, or None.
+    Consecutive appends are coalesced in the same batch only if they have the same
+    `rows` flag and all or none of them have `times`.
+    Batches failing to be written are retried at the next flush, up to `retries` times."""
+
+    def __init__(self, write, interval=1., flush_bytes=2**20, max_bytes=2**24, retries=3):
+        self.write = write
+        self.interval = interval
+        """Maximum time pending data is kept in memory"""
+        self.flush_bytes = flush_bytes
+        """Pending size triggering an immediate flush"""
+        self.max_bytes = max_bytes
+        """Pending size blocking further appends until flushed"""
+        self.retries = retries
+        """Further attempts to write a failed batch before dropping it"""
+        self.pending = {}
+        """Path: list of [rows, chunks, times, size, failures] batches"""
+        self.size = 0
+        self.busy = False
+        self.failed = False
+        """True if the last flush left failed batches to retry"""
+        self.dropped = 0
+        """Number of batches dropped after too many failed writes"""
+        self.waiting = 0
+        """Number of threads waiting for a flush"""
+        self.running = True
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name='WriteBuffer')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def put(self, path, data, rows=False, times=None):
+        """Queue `data` for appending to node `path`.
+        If `rows`, `data` is a list of rows with optional `times` labels.
+        Blocks while the buffer is full.
+        Returns False if the buffer was stopped: data must then be written by the caller."""
+        n = nbytes(data)
+        with self.cond:
+            if not self.running:
+                return False
+            self.waiting += 1
+            while self.size and self.size + n > self.max_bytes:
+                self.cond.notify_all()
+                self.cond.wait(self.interval)
+            self.waiting -= 1
+            batches = self.pending.setdefault(path, [])
+            timed = bool(rows and times)
+            last = batches[-1] if batches else None
+            if last is None or last[0] != rows or (last[2] is not None) != timed or last[4]:
+                last = [rows, [], [] if timed else None, 0, 0]
+                batches.append(last)
+            if rows:
+                last[1].extend(data)
+                if timed:
+                    last[2].extend(times)
+            else:
+                last[1].append(data)
+            last[3] += n
+            self.size += n
+            if self.size >= self.flush_bytes:
+                self.cond.notify_all()
+        return True
+
+    def _write(self, path, batches):
+        """Write `batches` of `path` in order.
+        Returns the batches left to retry, starting from the first failed one."""
+        for i, batch in enumerate(batches):
+            rows, chunks, times = batch[:3]
+            try:
+                self.write(path, rows, chunks, times)
+            except:
+                print_exc()
+                batch[4] += 1
+                if batch[4] <= self.retries:
+                    print('WriteBuffer: write failed, retrying later', path, batch[4])
+                    return batches[i:]
+                print('WriteBuffer: dropping data after failed writes', path, batch[4])
+                self.dropped += 1
+        return []
+
+    def run(self):
+        """Flusher thread loop"""
+        while True:
+            with self.cond:
+                # Producers blocked in put or sync only need a flush if data is pending
+                if self.running and (self.failed or not self.pending or
+                                     (not self.waiting and self.size < self.flush_bytes)):
+                    self.cond.wait(self.interval)
+                pending, self.pending = self.pending, {}
+                self.busy = True
+                running = self.running
+            failed = {}
+            for path, batches in pending.items():
+                left = self._write(path, batches)
+                if left:
+                    failed[path] = left
+            with self.cond:
+                # Failed batches are written before the ones queued meanwhile
+                for path, left in failed.items():
+                    self.pending[path] = left + self.pending.get(path, [])
+                # Release memory only after writing, so the buffer stays bounded
+                self.size -= sum(b[3] for batches in pending.values() for b in batches)
+                self.size += sum(b[3] for left in failed.values() for b in left)
+                self.failed = bool(failed)
+                self.busy = False
+                self.cond.notify_all()
+            if not running and not failed:
+                return
+
+    def sync(self):
+        """Wait until all data queued so far was written.
+        Returns False if some data is still pending after a failed write."""
+        with self.cond:
+            self.waiting += 1
+            while (self.busy or self.pending and not self.failed) and self.thread.is_alive():
+                self.cond.notify_all()
+                self.cond.wait(self.interval)
+            self.waiting -= 1
+            return not self.pending
+
+    def stop(self):
+        """Write all pending data and terminate the flusher thread.
+        Failed batches are retried until written or dropped."""
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        self.thread.join()
+        return not self.dropped
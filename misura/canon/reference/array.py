@@ -8,6 +8,8 @@ from .reference import Reference
 
 class Array(Reference):
     fields = [('t', 'float64'), ('v', 'float64')]
+    catch_up_steps = 100
+    """Summary lag, in steps, triggering a catch up interpolation"""
 
     def __init__(self, outfile, folder=False, opt=False, write_current=False, with_summary=True):
         self.with_summary = with_summary
@@ -46,17 +48,40 @@ class Array(Reference):
         if not self.path.startswith('/summary') and len(self.fields) == 2:
             self.summary = Array(self.outfile, '/summary' + self.path)
 
+    def commit(self, data):
+        """Encode data, write it onto the reference node and extend its decimation pyramid."""
+        n = Reference.commit(self, data)
+        if n and self.summary is not False:
+            self.outfile.update_lod(self.path)
+        return n
+
+    @classmethod
+    def encode_row(cls, td):
+        """Flatten point `td` into a row tuple, or None if invalid"""
+        t, dat = td
+        if len(cls.fields) == 2:
+            return (t, dat)
+        return tuple([t] + list(dat))
+
     @classmethod
     def encode(cls, dat):
         if len(cls.fields) == 1:
             return np.array(dat, dtype=cls.fields)
-        
-        t, dat = dat
-        if len(cls.fields) == 2:
-            return np.array([(t, dat)], dtype=cls.fields)
-        else:
-            dat = list(dat)
-            return np.array([tuple([t] + dat)], dtype=cls.fields)
+        r = cls.encode_row(dat)
+        if r is None:
+            return None
+        return np.array([r], dtype=cls.fields)
+
+    @classmethod
+    def encode_batch(cls, data):
+        """Build a single structured array out of a sequence of points"""
+        if len(cls.fields) == 1:
+            return super(Array, cls).encode_batch(data)
+        rows = [cls.encode_row(td) for td in data if td is not False]
+        rows = [r for r in rows if r is not None]
+        if not rows:
+            return None
+        return np.array(rows, dtype=cls.fields)
 
     @classmethod
     def decode(cls, dat):
@@ -71,11 +96,22 @@ class Array(Reference):
             return list(dat)
         return Reference.decode(tuple(dat))
 
-    def interpolate(self, step=1, kind=1):
-        """Array interpolation for summary synchronization."""
+    def _tail(self, start=0):
+        """Time and value vectors of the rows following `start` index"""
+        rows = self.outfile.col(self.path, slice(start, None), raw=True)
+        return rows['t'], rows['v'].astype(np.float64)
+
+    def interpolate(self, step=1, kind=1, catch_up=None):
+        """Array interpolation for summary synchronization.
+        Latest points are fitted with a `kind` degree polynomial.
+        In `catch_up` mode, all missing summary points are back-filled
+        by piecewise linear interpolation. If None, catch up
+        when the summary lags behind more than `catch_up_steps`."""
         vt = Reference.interpolate(self, step)
         if vt is False:
             return False
+        if catch_up is None:
+            catch_up = len(vt) > self.catch_up_steps
         # Value sequence
         # starting from the oldest time minus step
         oldi = self.get_time(vt[0] - step)
@@ -85,32 +121,20 @@ class Array(Reference):
         # If possible, go back one more point, for interpolation safety
         if oldi > 1:
             oldi -= 1
-        # Decode values and separate time and value vectors
-        dat = self[oldi:]
-        dat = np.array(dat)
-        dat = dat.transpose()
-        # Build a linear spline using vt points as knots
-        #f=LSQUnivariateSpline(dat[0],dat[1],vt, k=kind)
-        # Do a linear fitting
-        (slope, const), res, rank, sing, rcond = np.polyfit(
-            dat[0], dat[1], kind, full=True)
-        # Build a vectorized evaluator
-        f = np.vectorize(lambda x: slope * x + const)
-        while vt[0] < dat[0][0] and len(vt) > 1:
-            vt = vt[1:]
-        while vt[-1] > dat[0][-1] and len(vt) > 1:
-            vt = vt[:-1]
+        t, v = self._tail(oldi)
+        # Only interpolate inside the data time range
+        vt = vt[(vt >= t[0]) & (vt <= t[-1])]
         if len(vt) <= 1:
             return False
-        try:
-            # Interpret time series
-            out = f(vt)
-        except:
-            print('Array.interpolate', self.path, vt, dat)
-            raise
-        # Encode in (t,v) append-able list
-        out = np.array([vt, out]).transpose()
-        self.summary.commit(out)
+        if catch_up:
+            out = np.interp(vt, t, v)
+        else:
+            out = np.polyval(np.polyfit(t, v, kind), vt)
+        # Append all points at once
+        rows = np.empty(len(vt), dtype=self.summary.fields)
+        rows['t'] = vt
+        rows['v'] = out
+        self.summary.append(rows)
         return True
 
 
@@ -167,14 +191,13 @@ class Meta(Array):
               ('time', 'float64'), ('temp', 'float64')]
 
     @classmethod
-    def encode(cls, dat):
-        """Flatten the Meta dictionary into a float list of t,value,time,temp"""
-        t, dat = dat
+    def encode_row(cls, td):
+        """Flatten the Meta dictionary into a float tuple of t,value,time,temp"""
+        t, dat = td
         if len(dat) > 3:
             print('wrong meta', dat, len(dat))
             return None
-        r = (t, dat['value'], dat['time'], dat['temp'])
-        return np.array([r], dtype=cls.fields)
+        return (t, dat['value'], dat['time'], dat['temp'])
 
     @classmethod
     def decode(cls, dat):
@@ -6,6 +6,10 @@ import tables
 from ..parameters import cfilter
 from .reference import Reference
 from .variable import VariableLength, binary_cast
+try:
+    unicode('a')
+except:
+    unicode = str
 
 
 def decode_time(node, index):
@@ -43,14 +47,19 @@ class Binary(VariableLength):
         t, data = data
         if data is False:
             return False
-        ta = binary_cast([t], 'd', 'BBBBBBBB')
-        dat = np.array([ord(d) for d in data]).astype('i8')
+        ta = np.array(binary_cast([t], 'd', 'BBBBBBBB'), dtype=np.uint8)
+        if isinstance(data, unicode):
+            data = data.encode('utf-8')
+        dat = np.frombuffer(data, dtype=np.uint8)
         return np.concatenate((ta, dat))
 
     @classmethod
     def decode(cls, flattened):
         if len(flattened) < 8:
             return None
+        flattened = np.asarray(flattened)
+        # Compatibility with rows encoded as wider integers
+        if flattened.dtype != np.uint8:
+            flattened = flattened.astype(np.uint8)
         t = binary_cast(flattened[:8], 'BBBBBBBB', 'd')[0]
-        dat = ''.join([chr(d) for d in flattened[8:]])
-        return t, dat
+        return t, flattened[8:].tobytes()
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 """Option persistence on HDF files."""
+import struct
+import zlib
 import tables
 import numpy as np
 
@@ -14,10 +16,45 @@ def decode_time(node, index):
     return t
 
 
+raw_codec = 0
+zlib_codec = 1
+"""Frame codec identifiers. Legacy frames start with a zlib header byte (0x78)."""
+frame_header = struct.Struct('<BHH')
+"""Codec identifier, height, width"""
+
+
 class Image(VariableLength):
 
+    """Frames are stored as time, codec, height, width and pixel bytes.
+    Pixels can be compressed per frame by zlib, or stored raw,
+    optionally compressed by a PyTables filter on the whole node.
+    By default frames are written in the legacy format, readable by older versions."""
     unbound = VariableLength.unbound.copy()
     unbound['decode_time'] = decode_time
+    codec = 'legacy'
+    """Frame compression: 'legacy' (zlib-compressed numpy array), 'zlib', 'none',
+    or a PyTables complib (eg: 'blosc:lz4') applied as node filter.
+    Frames written with any codec but 'legacy' cannot be decoded by older versions."""
+    level = 6
+    """Compression level"""
+
+    def __init__(self, outfile, folder=False, opt=False, write_current=False, codec=None, level=None):
+        if codec is not None:
+            self.codec = codec
+        if level is not None:
+            self.level = level
+        VariableLength.__init__(self, outfile, folder=folder,
+                                opt=opt, write_current=write_current)
+
+    @property
+    def filters(self):
+        """Node filters suitable for the codec.
+        Frames compressed by zlib are not filtered again."""
+        if self.codec in ('legacy', 'none'):
+            return cfilter
+        if self.codec == 'zlib':
+            return None
+        return tables.Filters(complevel=self.level, complib=self.codec)
 
     def create(self):
         """Create a VLArray for containing frames as variable-length sequences of t,width, pixels..."""
@@ -28,36 +65,63 @@ class Image(VariableLength):
                                     name=self.handle,
                                     atom=tables.UInt8Atom(shape=()),
                                     title=self.name,
-                                    filters=cfilter,
+                                    filters=self.filters,
                                     createparents=True,
                                     reference_class=self.__class__.__name__)
         self.path = self.folder + self.handle
         return True
 
     @classmethod
-    def compress(cls, img, as_string=False):
-        """Simple lossless image array compression. Flatten, zlib."""
-        h0, w0 = img.shape
-        w = binary_cast([w0], 'H', 'BB')
-        h = binary_cast([h0], 'H', 'BB')
-        cp = np.concatenate((w, h, img.astype('uint8').flatten()))
-        # VLR.cmp: more 2x compression
-        scp = VariableLength.compress(cp)
+    def compress(cls, img, as_string=False, codec=None, level=None):
+        """Lossless image array compression into codec, height, width, pixel bytes."""
+        if codec is None:
+            codec = cls.codec
+        if level is None:
+            level = cls.level
+        img = np.ascontiguousarray(img, dtype=np.uint8)
+        h, w = img.shape
+        if codec == 'legacy':
+            return cls.compress_legacy(img, as_string)
+        pix = img.tobytes()
+        cid = raw_codec
+        if codec == 'zlib':
+            cid = zlib_codec
+            pix = zlib.compress(pix, level)
+        scp = frame_header.pack(cid, h, w) + pix
         if as_string:
             return scp
-        # translate string into unit8 for storage
-        vcp = np.array([ord(d) for d in scp]).astype('uint8')
-        return vcp
+        return np.frombuffer(scp, dtype=np.uint8)
 
     @classmethod
     def decompress(cls, imgz):
         """Decompress lossless image data back into 2D array."""
-        # translate back uint8 into string
-        if not isinstance(imgz, str):
-            imgz = ''.join([chr(d) for d in imgz])
-        # zlib decompression
+        if not isinstance(imgz, bytes):
+            imgz = np.asarray(imgz, dtype=np.uint8).tobytes()
+        cid = bytearray(imgz[:1])[0]
+        if cid not in (raw_codec, zlib_codec):
+            return cls.decompress_legacy(imgz)
+        cid, h, w = frame_header.unpack(imgz[:frame_header.size])
+        pix = imgz[frame_header.size:]
+        if cid == zlib_codec:
+            pix = zlib.decompress(pix)
+        return np.frombuffer(pix, dtype=np.uint8).reshape((h, w)).copy()
+
+    @classmethod
+    def compress_legacy(cls, img, as_string=False):
+        """Compress frames as older versions: zlib-compressed numpy array of width, height, pixels."""
+        h, w = img.shape
+        cp = np.concatenate((binary_cast([w], 'H', 'BB'),
+                             binary_cast([h], 'H', 'BB'),
+                             img.flatten()))
+        scp = VariableLength.compress(cp)
+        if as_string:
+            return scp
+        return np.frombuffer(scp, dtype=np.uint8)
+
+    @classmethod
+    def decompress_legacy(cls, imgz):
+        """Decompress frames written by older versions: zlib-compressed numpy array of width, height, pixels."""
         imgz = VariableLength.decompress(imgz)
-        ####
         w = binary_cast(imgz[:2], 'BB', 'H')[0]
         h = binary_cast(imgz[2:4], 'BB', 'H')[0]
         img = imgz[4:]
@@ -65,16 +129,24 @@ class Image(VariableLength):
         return img
 
     @classmethod
-    def encode(cls, data):
-        """Encode time, image into a single array containing time, width, height, and flattened pixel intensities."""
+    def encode(cls, data, codec=None, level=None):
+        """Encode time, image into a single array containing time, codec, height, width, and pixels."""
         t, img = data
         # Cast double time into eight 8-bit integers
-#		ta=np.array(binary_cast([t],'d','hhhh'))
-        ta = np.array(binary_cast([t], 'd', 'BBBBBBBB'))
-        # Cast w,h 16-bit unsigned integers into two unsigned 8-bit integers
-        cp = cls.compress(img)
-        out = np.concatenate((ta, cp)).astype('B')
-        return out
+        ta = np.array(binary_cast([t], 'd', 'BBBBBBBB'), dtype=np.uint8)
+        cp = cls.compress(img, codec=codec, level=level)
+        return np.concatenate((ta, cp))
+
+    def encode_rows(self, data):
+        """Encode frames with the codec of this reference"""
+        rows = []
+        times = []
+        for d in data:
+            if d is False:
+                continue
+            rows.append(self.encode(d, self.codec, self.level))
+            times.append(d[0])
+        return rows, times
 
     @classmethod
     def decode(cls, flattened):
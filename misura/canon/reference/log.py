@@ -31,8 +31,9 @@ class Log(Reference):
         return True
 
     @classmethod
-    def encode(cls, dat):
-        t, dat = dat
+    def encode_row(cls, td):
+        """Flatten a log point into a (t, priority, msg) tuple, or None if invalid"""
+        t, dat = td
         if len(dat) != 2:
             print('Log: wrong data length')
             return None
@@ -41,7 +42,23 @@ class Log(Reference):
             dat[1] = dat[1].encode('ascii', 'replace')
         if not (isinstance(dat[1], str) or isinstance(dat[1], bytes)):
             return None
-        return np.array([tuple([t] + dat)], dtype=cls.fields)
+        return tuple([t] + dat)
+
+    @classmethod
+    def encode(cls, dat):
+        r = cls.encode_row(dat)
+        if r is None:
+            return None
+        return np.array([r], dtype=cls.fields)
+
+    @classmethod
+    def encode_batch(cls, data):
+        """Build a single structured array out of a sequence of log points"""
+        rows = [cls.encode_row(td) for td in data if td is not False]
+        rows = [r for r in rows if r is not None]
+        if not rows:
+            return None
+        return np.array(rows, dtype=cls.fields)
 
     def interpolate(self, *a, **k):
         """Interpolation has no sense for logs."""
@@ -53,6 +53,22 @@ class Profile(VariableLength):
         out = np.array([x, y]).transpose()
         return out
 
+    @classmethod
+    def decode_rows(cls, rows):
+        """Decode many encoded frames at once.
+        Returns times, widths, heights, offsets and concatenated x, y coords:
+        coords of frame i are x[offsets[i]:offsets[i+1]]."""
+        n = len(rows)
+        if not n:
+            e = np.array([], dtype=np.uint16)
+            return np.array([]), e, e, np.zeros(1, dtype=np.int64), e, e
+        head = np.array([r[:4] for r in rows])
+        t = np.ascontiguousarray(head[:, :, 0]).view('<f8')[:, 0]
+        lens = np.array([len(r) - 4 for r in rows], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(lens)))
+        body = np.concatenate([r[4:] for r in rows])
+        return t, head[:, 0, 1], head[:, 1, 1], offsets, body[:, 0], body[:, 1]
+
     @classmethod
     def decode(cls, flattened):
         """Decodes a flattened 2D array into t, (w,h), x, y structures"""
@@ -64,28 +80,27 @@ class Profile(VariableLength):
         h = y[1]
         return t, ((w, h), x[4:], y[4:])
 
+def explode_steps(dx, dy):
+    """Split each (dx, dy) step longer than one pixel into unit movements.
+    A step becomes max(|dx|, |dy|) movements: the last |dx| move along x, the last |dy| along y.
+    Returns the x, y movements and the number of movements of each step."""
+    ax = np.abs(dx)
+    ay = np.abs(dy)
+    m = np.maximum(np.maximum(ax, ay), 1)
+    step = np.repeat(np.arange(len(m)), m)
+    # Position of each movement counted from the end of its step
+    end = np.cumsum(m)
+    r = end[step] - 1 - np.arange(len(step))
+    ox = np.sign(dx)[step] * (r < ax[step])
+    oy = np.sign(dy)[step] * (r < ay[step])
+    return ox, oy, m
+
+
 def explode_jumps(x, y):
-    dx = np.diff(x)
-    dy = np.diff(y)
-    ox = []
-    oy = []
-    for i, vx in enumerate(dx):
-        ax = abs(vx)
-        vy = dy[i]
-        ay = abs(vy)
-        if ax<=1 and ay<=1:
-            ox.append(vx)
-            oy.append(vy)
-            continue
-        ox += [0]*max(ax, ay)
-        oy += [0]*max(ax, ay)
-        if ax:
-            ox[-ax:] = [np.sign(vx)]*ax
-        if ay:
-            oy[-ay:] = [np.sign(vy)]*ay
-            
-    ox, oy = np.array(ox), np.array(oy)
-    
+    """Convert absolute coords x, y into unit movements, exploding jumps"""
+    dx = np.diff(np.asarray(x, dtype=np.int64))
+    dy = np.diff(np.asarray(y, dtype=np.int64))
+    ox, oy, m = explode_steps(dx, dy)
     return ox, oy
 
 scale = 9
@@ -120,6 +135,24 @@ def accumulate_coords(x,y):
     d = (dx+1)*3 + (dy+1)
     return couple(d, scale)
 
+def accumulate_coords_batch(xs, ys):
+    """Vectorized accumulate_coords over a list of frames with coords `xs`, `ys`.
+    Frames must not be empty. Returns the list of cumulative coords of each frame."""
+    lens = np.array([len(x) for x in xs], dtype=np.int64)
+    if not len(lens):
+        return []
+    x = np.concatenate([np.asarray(x, dtype=np.int64) for x in xs])
+    y = np.concatenate([np.asarray(y, dtype=np.int64) for y in ys])
+    # Drop steps crossing frame boundaries
+    keep = np.ones(max(len(x) - 1, 0), dtype=bool)
+    keep[np.cumsum(lens)[:-1] - 1] = False
+    ox, oy, m = explode_steps(np.diff(x)[keep], np.diff(y)[keep])
+    d = (ox + 1) * 3 + (oy + 1)
+    # Movements boundaries of each frame
+    nsteps = np.maximum(lens - 1, 0)
+    bounds = np.concatenate(([0], np.cumsum(m)))[np.concatenate(([0], np.cumsum(nsteps)))]
+    return [couple(d[bounds[i]:bounds[i + 1]], scale) for i in range(len(lens))]
+
 def decumulate_coords(x0, y0, v):
     """Convert cumulative coords v into absolute coords x,y"""
     # Conversion to SIGNED int
@@ -146,6 +179,45 @@ def decumulate_coords(x0, y0, v):
     y = np.concatenate(([y0], y0+np.cumsum(y)))
     return x.astype('uint16'), y.astype('uint16')
     
+def decumulate_coords_batch(x0, y0, vs):
+    """Vectorized decumulate_coords over many frames with starting coords `x0`, `y0`
+    and cumulative coords list `vs`.
+    Returns offsets and concatenated x, y: coords of frame i are x[offsets[i]:offsets[i+1]]."""
+    n = len(vs)
+    lens = np.array([len(v) for v in vs], dtype=np.int64)
+    v = np.concatenate([np.asarray(v, dtype=np.int16) for v in vs] + [np.array([], dtype=np.int16)])
+    # Unpack couples, then drop padding identities
+    codes = np.array([v % scale, v // scale]).flatten('F')
+    ncodes = 2 * lens
+    ends = np.cumsum(ncodes)
+    padded = ncodes > 0
+    padded[padded] = codes[ends[padded] - 1] == 4
+    keep = np.ones(len(codes), dtype=bool)
+    keep[ends[padded] - 1] = False
+    codes = codes[keep] - 4
+    ncodes -= padded
+    # Same mapping as decumulate_coords
+    a = np.abs(codes)
+    sgn = np.sign(codes)
+    mx = (a > 1) * sgn
+    my = (a != 3) * sgn * (1 - 2 * (a == 2))
+    # Each frame starts with its starting point, followed by its movements
+    npoints = ncodes + 1
+    offsets = np.concatenate(([0], np.cumsum(npoints)))
+    starts = offsets[:-1]
+    frame = np.repeat(np.arange(n), npoints)
+    move = np.ones(offsets[-1], dtype=bool)
+    move[starts] = False
+    out = []
+    for c0, m in ((x0, mx), (y0, my)):
+        d = np.zeros(offsets[-1], dtype=np.int64)
+        d[move] = m
+        c = np.cumsum(d)
+        c = np.asarray(c0, dtype=np.int64)[frame] + c - c[starts][frame]
+        out.append(c.astype('uint16'))
+    return offsets, out[0], out[1]
+
+
 def decode_time_uint8(node, index):
     t = binary_cast(node[index][:8], '<8B', 'd')[0]
     return t   
@@ -170,6 +242,35 @@ class CumulativeProfile(Profile):
         out = np.concatenate((coords, cumul))
         return out
 
+    @classmethod
+    def encode_rows(cls, data):
+        """Encode many frames at once. Returns the list of encoded rows and their times."""
+        frames = [td for td in data if td is not False and len(td[1]) == 3
+                  and len(td[1][0]) == 2 and len(td[1][1])]
+        if not frames:
+            return [], []
+        cumuls = accumulate_coords_batch([prf[1] for t, prf in frames],
+                                         [prf[2] for t, prf in frames])
+        rows = []
+        for (t, ((w, h), x, y)), cumul in zip(frames, cumuls):
+            coords = np.array(binary_cast([t, w, h, x[0], y[0]], 'dHHHH', '<16B'))
+            rows.append(np.concatenate((coords, cumul.round(0).astype(np.uint8))))
+        return rows, [td[0] for td in frames]
+
+    @classmethod
+    def decode_rows(cls, rows):
+        """Decode many encoded frames at once.
+        Returns times, widths, heights, offsets and concatenated x, y coords:
+        coords of frame i are x[offsets[i]:offsets[i+1]]."""
+        if not len(rows):
+            e = np.array([], dtype=np.uint16)
+            return np.array([]), e, e, np.zeros(1, dtype=np.int64), e, e
+        head = np.array([r[:16] for r in rows], dtype=np.uint8)
+        t = np.ascontiguousarray(head[:, :8]).view('<f8')[:, 0]
+        w, h, x0, y0 = np.ascontiguousarray(head[:, 8:]).view('<u2').transpose()
+        offsets, x, y = decumulate_coords_batch(x0, y0, [r[16:] for r in rows])
+        return t, w, h, offsets, x, y
+
     @classmethod
     def decode(cls, flattened):
         """Decodes a flattened 2D array into t, (w,h), x, y structures"""
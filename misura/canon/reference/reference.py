@@ -166,19 +166,23 @@ class Reference(object):
             self.path, t, get=self.unbound['decode_time'])
         return idx
 
+    @classmethod
+    def encode_batch(cls, data):
+        """Encode a sequence of points into a single array of rows.
+        Returns None if no point could be encoded."""
+        rows = [cls.encode(td) for td in data if td is not False]
+        rows = [r for r in rows if r is not None]
+        if not rows:
+            return None
+        return np.concatenate(rows)
+
     def commit(self, data):
-        """Encode data and write it onto the reference node."""
-        # Cut too old points
-        n = 0
-        for td in data:
-            if td is False:
-                continue
-            app = self.encode(td)
-            if app is None:
-                continue
-            self.append(app)
-            n += 1
-        return n
+        """Encode data and write it onto the reference node with a single append."""
+        app = self.encode_batch(data)
+        if app is None:
+            return 0
+        self.append(app)
+        return len(app)
 
     def interpolate(self, step=1):
         """Synchronize the internal interpolated summary reference.
@@ -0,0 +1,62 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Compare Image reference codecs: write and read speed, file size.
+Usage: python -m misura.canon.reference.tests.benchmark_image [frames]"""
+from __future__ import print_function
+import os
+import sys
+import tempfile
+from time import time
+
+import numpy as np
+import tables
+
+from misura.canon import indexer, reference
+
+codecs = [('legacy', 6), ('zlib', 1), ('zlib', 6), ('none', 0),
+          ('blosc:lz4', 5), ('blosc:zstd', 5), ('lzo', 1)]
+
+
+def frames(n, h=480, w=640):
+    """Camera-like frames: smooth background, noise and a moving dark sample"""
+    y, x = np.mgrid[:h, :w]
+    base = 120 + 60 * np.sin(x / 80.) * np.cos(y / 60.)
+    for i in range(n):
+        img = base + np.random.normal(0, 4, (h, w))
+        img[(x - 200 - i) ** 2 + (y - 240) ** 2 < 80 ** 2] = 20
+        yield float(i), img.clip(0, 255).astype(np.uint8)
+
+
+def run(codec, level, data):
+    path = tempfile.mktemp('.h5')
+    tables.open_file(path, mode='w').close()
+    outfile = indexer.SharedFile(path)
+    ref = reference.Image(outfile, '/', {'handle': 'img', 'name': 'Image'},
+                          codec=codec, level=level)
+    t0 = time()
+    ref.commit(data)
+    outfile.flush()
+    t1 = time()
+    for i in range(len(data)):
+        ref[i]
+    t2 = time()
+    outfile.close()
+    size = os.path.getsize(path)
+    os.remove(path)
+    return t1 - t0, t2 - t1, size
+
+
+def main(n=50):
+    data = list(frames(n))
+    raw = sum(img.nbytes for t, img in data)
+    print('{} frames, {:.1f} MB raw'.format(n, raw / 1e6))
+    print('{:<12}{:>6}{:>12}{:>12}{:>10}'.format('codec', 'level', 'write fps', 'read fps', 'ratio'))
+    for codec, level in codecs:
+        if codec not in ('legacy', 'zlib', 'none') and tables.which_lib_version(codec.split(':')[0]) is None:
+            continue
+        w, r, size = run(codec, level, data)
+        print('{:<12}{:>6}{:>12.1f}{:>12.1f}{:>10.2f}'.format(codec, level, n / w, n / r, raw / float(size)))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -12,6 +12,7 @@ from misura.canon import indexer
 from misura.canon.csutil import flatten as flat
 from misura.canon import reference
 from misura.canon import determine_path
+from misura.canon.parameters import cfilter
 
 
 class ReferenceFunctions(unittest.TestCase):
@@ -36,6 +37,32 @@ class ReferenceFunctions(unittest.TestCase):
         self.assertEqual(list(x), [1,2,2,3,4])
         self.assertEqual(list(y), [10,9,8,9,10])
         
+    def test_explode_jumps(self):
+        x = [5, 6, 9, 9, 7, 7, 8]
+        y = [5, 5, 4, 8, 8, 8, 9]
+        dx, dy = reference.explode_jumps(x, y)
+        self.assertEqual(list(dx), [1, 1, 1, 1, 0, 0, 0, 0, -1, -1, 0, 1])
+        self.assertEqual(list(dy), [0, 0, 0, -1, 1, 1, 1, 1, 0, 0, 0, 1])
+        self.assertEqual(len(reference.explode_jumps([3], [4])[0]), 0)
+
+    def test_accumulate_coords_batch(self):
+        xs = [[301, 302, 305, 305], [10], [7, 6, 6, 9, 9]]
+        ys = [[299, 297, 297, 296], [20], [7, 8, 8, 4, 5]]
+        acc = reference.accumulate_coords_batch(xs, ys)
+        self.assertEqual(len(acc), 3)
+        for x, y, a in zip(xs, ys, acc):
+            self.assertEqual(list(a), list(reference.accumulate_coords(x, y)))
+            if len(x) == 1:
+                continue
+            x1, y1 = reference.decumulate_coords(x[0], y[0], a)
+            self.assertEqual(x1[-1], x[-1])
+            self.assertEqual(y1[-1], y[-1])
+        frames = [(i * 1., ((640, 480), np.array(x), np.array(y))) for i, (x, y) in enumerate(zip(xs, ys))]
+        rows, times = reference.CumulativeProfile.encode_rows(frames + [False])
+        self.assertEqual(times, [0., 1., 2.])
+        for f, row in zip(frames, rows):
+            self.assertEqual(list(row), list(reference.CumulativeProfile.encode(f)))
+
     def test_accumulate_decumulate_coords(self):
         x = [301, 302, 302, 302, 303, 302, 303, 303, 302, 303]
         y = [299, 298, 297, 298, 298, 297, 296, 297, 296, 296]
@@ -140,6 +167,37 @@ class OutFile(unittest.TestCase):
         self.assertEqual(len(ref), 18)
         return
 
+    def test_time_index(self):
+        if self.refClass is False or not issubclass(self.refClass, reference.VariableLength):
+            raise unittest.SkipTest('')
+        self.mkfile()
+        ref = self.refClass(self.outfile, '/', self.opt)
+        ref.commit([self.rand(float(i)) for i in range(1, 10)])
+        tpath = '/userdata/tindex' + ref.path
+        self.assertEqual(self.outfile.len(tpath), 9)
+        self.assertEqual(ref.get_time(3.2), 2)
+        self.assertEqual(ref.get_time(100), 8)
+        # Missing index: bisection, without writing while searching
+        self.outfile.remove_node(tpath)
+        self.outfile.time_index.invalidate()
+        self.assertEqual(ref.get_time(5.9), 5)
+        self.assertFalse(self.outfile.has_node(tpath))
+        # Commits cannot extend a missing index
+        ref.commit([self.rand(10.)])
+        self.assertFalse(self.outfile.has_node(tpath))
+        self.assertEqual(ref.get_time(10.), 9)
+        # Explicit rebuild
+        self.assertEqual(self.outfile.rebuild_time_index(ref.path), 10)
+        self.assertEqual(self.outfile.len(tpath), 10)
+        self.assertEqual(self.outfile.rebuild_time_index(ref.path), 0)
+        self.assertEqual(ref.get_time(5.9), 5)
+        ref.commit([self.rand(11.)])
+        self.assertEqual(ref.get_time(11.), 10)
+        self.assertEqual(self.outfile.len(tpath), 11)
+        # Removing the reference removes its index
+        self.outfile.remove_node(ref.path)
+        self.assertFalse(self.outfile.has_node(tpath))
+
 
 class Array(OutFile):
     refClass = reference.Array
@@ -148,6 +206,23 @@ class Array(OutFile):
     @classmethod
     def rand(cls, t):
         return [t, t * 10]
+
+    def test_interpolate(self):
+        self.mkfile()
+        ref = self.refClass(self.outfile, '/', self.opt)
+        ref.commit([(t, 2 * t + 1) for t in range(300)])
+        # Back-fill the whole summary
+        self.assertTrue(ref.interpolate())
+        s = self.outfile.col('/summary/test')
+        self.assertEqual(list(s[:, 0]), list(range(2, 298)))
+        self.assertEqual(list(s[:, 1]), list(2 * s[:, 0] + 1))
+        # Incremental fit
+        ref.commit([(t, 2 * t + 1) for t in range(300, 310)])
+        self.assertTrue(ref.interpolate(catch_up=False))
+        s = self.outfile.col('/summary/test')
+        self.assertEqual(list(s[-10:, 0]), list(range(298, 308)))
+        self.assertTrue(np.allclose(s[-10:, 1], 2 * s[-10:, 0] + 1))
+        self.assertFalse(ref.interpolate())
     
     
     
@@ -227,6 +302,59 @@ class Image(OutFile):
 #		self.assertEqual(list(cp),mcp)
 
 
+class ImageCodec(unittest.TestCase):
+
+    def setUp(self):
+        self.img = (np.arange(48 * 64).reshape(48, 64) % 251).astype(np.uint8)
+
+    def test_codecs(self):
+        for codec in ('legacy', 'zlib', 'none', 'blosc:lz4'):
+            enc = reference.Image.encode((1.5, self.img), codec=codec)
+            self.assertEqual(enc.dtype, np.uint8)
+            t, img = reference.Image.decode(enc)
+            self.assertEqual(t, 1.5)
+            self.assertTrue((img == self.img).all())
+        raw = reference.Image.compress(self.img, codec='none')
+        self.assertEqual(len(raw), 5 + self.img.size)
+        self.assertLess(len(reference.Image.compress(self.img, codec='zlib')), len(raw))
+        # Default frames are readable by older versions
+        cp = reference.Image.compress(self.img, as_string=True)
+        self.assertEqual(cp, reference.Image.compress_legacy(self.img, as_string=True))
+        imgz = reference.VariableLength.decompress(cp)
+        self.assertEqual(list(imgz[:4]), [64, 0, 48, 0])
+
+    def test_decompress_legacy(self):
+        h, w = self.img.shape
+        cp = np.concatenate((reference.binary_cast([w], 'H', 'BB'),
+                             reference.binary_cast([h], 'H', 'BB'),
+                             self.img.flatten()))
+        scp = reference.VariableLength.compress(cp)
+        img = reference.Image.decompress(np.frombuffer(scp, dtype=np.uint8))
+        self.assertTrue((img == self.img).all())
+
+    def test_commit(self):
+        outfile = mkfile()
+        opt = {'handle': 'img', 'name': 'Image'}
+        for codec in ('zlib', 'blosc:lz4'):
+            opt['handle'] = codec.replace(':', '_')
+            ref = reference.Image(outfile, '/', opt, codec=codec, level=1)
+            ref.commit([(float(i), self.img + i) for i in range(3)])
+            t, img = ref[2]
+            self.assertEqual(t, 2.)
+            self.assertTrue((img == self.img + 2).all())
+        self.assertEqual(outfile.get_node('/blosc_lz4').filters.complib, 'blosc:lz4')
+        self.assertFalse(outfile.get_node('/zlib').filters.complevel)
+        # Legacy frames keep the default node filter
+        opt['handle'] = 'legacy'
+        ref = reference.Image(outfile, '/', opt)
+        ref.commit([(1., self.img)])
+        self.assertTrue((ref[0][1] == self.img).all())
+        self.assertEqual(outfile.get_node('/legacy').filters.complevel, cfilter.complevel)
+        path = outfile.get_path()
+        outfile.close()
+        os.remove(path)
+
+
 class Profile(OutFile):
     __test__ = True
     refClass = reference.Profile
@@ -251,6 +379,24 @@ class Profile(OutFile):
         self.assertEqual(list(x.flatten()), list(x1.flatten()))
         self.assertEqual(list(y.flatten()), list(y1.flatten()))
 
+    def test_get_profiles(self):
+        self.mkfile()
+        for cls in (reference.Profile, reference.CumulativeProfile):
+            opt = self.opt
+            opt['handle'] = cls.__name__
+            ref = cls(self.outfile, '/', opt)
+            ref.commit([CumulativeProfile.rand(float(i)) for i in range(10)])
+            t, w, h, offsets, x, y = self.outfile.get_profiles(ref.path, 2, 7)
+            self.assertEqual(list(t), [2., 3., 4., 5., 6., 7.])
+            self.assertEqual(len(offsets), 7)
+            for i, j in enumerate(range(2, 8)):
+                t1, ((w1, h1), x1, y1) = ref[j]
+                self.assertEqual((w[i], h[i]), (w1, h1))
+                self.assertEqual(list(x[offsets[i]:offsets[i + 1]]), list(x1))
+                self.assertEqual(list(y[offsets[i]:offsets[i + 1]]), list(y1))
+            t = self.outfile.get_profiles(ref.path, step=3)[0]
+            self.assertEqual(list(t), [0., 3., 6., 9.])
+
 
 class CumulativeProfile(Profile):
     __test__ = False
@@ -316,6 +462,15 @@ class Binary(OutFile):
         self.assertEqual(t, t1)
         self.assertEqual(dat, dat1)
 
+    def test_decode_compat(self):
+        t, dat = self.rand(10.)
+        encoded = self.refClass.encode((t, dat))
+        self.assertEqual(encoded.dtype, np.uint8)
+        self.assertEqual(len(encoded), 8 + len(dat))
+        # Rows encoded as 64-bit integers
+        self.check_decode(encoded.astype('i8'), (t, dat))
+        self.check_decode(list(encoded), (t, dat))
+
 
 class Log(OutFile):
     __test__ = True
@@ -325,6 +480,16 @@ class Log(OutFile):
     def rand(cls, t):
         return [1. * t, [10, b'message%i' % t]]
 
+    def test_commit_batch(self):
+        self.mkfile()
+        ref = self.refClass(self.outfile, '/', self.opt)
+        # Skipped and invalid points are not written
+        data = [self.rand(1), False, [2., [10]], self.rand(3), [4., [10, 5]]]
+        self.assertEqual(ref.commit(data), 2)
+        self.assertEqual(len(ref), 2)
+        self.assertEqual(ref[1][0], 3.)
+        self.assertEqual(ref.commit([False]), 0)
+
 
 if __name__ == "__main__":
     unittest.main()
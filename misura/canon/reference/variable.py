@@ -3,10 +3,7 @@
 import numpy as np
 import struct
 import zlib
-try:
-    from cStringIO import StringIO
-except:
-    from io import StringIO
+from io import BytesIO
 from .reference import Reference
 # TODO: Unify commit/append!!! They are basically the same!
 
@@ -25,34 +22,43 @@ class VariableLength(Reference):
     @classmethod
     def compress(cls, img, level=6):
         """Compress the data array into a gzip string"""
-        g = StringIO()
+        g = BytesIO()
         np.save(g, img)
-        g.seek(0)
-        raw = g.read()
-        return zlib.compress(raw, level)
+        return zlib.compress(g.getvalue(), level)
 
     @classmethod
     def decompress(cls, imgz):
         """De-compress the data array from a gzip string"""
-        # Write the compressed data into the SIO
-        img = zlib.decompress(imgz)
-        s = StringIO.StringIO()
-        s.write(img)
-        s.seek(0)
-        # Load the gzip file
-        return np.load(s)
+        # Load the decompressed data from a memory buffer
+        return np.load(BytesIO(zlib.decompress(imgz)))
 
-    def commit(self, data):
-        """Encode data and write it onto the reference node."""
-        # Cut too old points
-        n = 0
+    def __getitem__(self, idx_or_slice):
+        """Single frames are read through the decoded frame cache of the output file"""
+        if isinstance(idx_or_slice, (int, np.integer)):
+            return self.outfile.get_frame(self.path, int(idx_or_slice), decode=type(self).decode)
+        return Reference.__getitem__(self, idx_or_slice)
+
+    @classmethod
+    def encode_rows(cls, data):
+        """Encode a sequence of points. Returns the list of encoded rows and their times."""
+        rows = []
+        times = []
         for d in data:
             if d is False:
                 continue
             t, dat = d
-            app = self.encode((t, dat))
+            app = cls.encode((t, dat))
             if app is None:
                 continue
-            self.append(app)
-            n += 1
-        return n
+            rows.append(app)
+            times.append(t)
+        return rows, times
+
+    def commit(self, data):
+        """Encode data and write all rows onto the reference node at once."""
+        rows, times = self.encode_rows(data)
+        if not rows:
+            return 0
+        # Rows are written together with their persistent time index
+        self.outfile.append_rows(self.path, rows, times)
+        return len(rows)